@@ -8,6 +8,7 @@ from matrx.agents.agent_utils.state_tracker import StateTracker
 from matrx.actions.door_actions import OpenDoorAction
 from matrx.actions.object_actions import GrabObject, DropObject
 from matrx.messages.message import Message
+from agents1.Trust import TrustModel
 
 class Phase(enum.Enum):
     PLAN_PATH_TO_CLOSED_DOOR=1,
@@ -21,6 +22,7 @@ class BaseLineAgent(BW4TBrain):
         super().__init__(settings)
         self._phase = Phase.PLAN_PATH_TO_CLOSED_DOOR
         self._teamMembers = []
+        self._trust = TrustModel()
 
     def initialize(self):
         super().initialize()
@@ -88,7 +90,9 @@ class BaseLineAgent(BW4TBrain):
         receivedMessages = {}
         for member in teamMembers:
             receivedMessages[member] = []
-        for mssg in self.received_messages:
+        # each message is read once, the trust beliefs remember what was in it
+        while len(self.received_messages) != 0:
+            mssg = self.received_messages.popleft()
             for member in teamMembers:
                 if mssg.from_id == member:
                     receivedMessages[member].append(mssg.content)       
@@ -96,16 +100,16 @@ class BaseLineAgent(BW4TBrain):
 
     def _trustBlief(self, member, received):
         '''
-        Baseline implementation of a trust belief. Creates a dictionary with trust belief scores for each team member, for example based on the received messages.
+        Baseline implementation of a trust belief. Updates the trust belief score of each team member with the received messages.
+        @return dict with the trust score of each team member
         '''
-        # You can change the default value to your preference
-        default = 0.5
-        trustBeliefs = {}
-        for member in received.keys():
-            trustBeliefs[member] = default
         for member in received.keys():
+            self._trust.add_member(member)
             for message in received[member]:
-                if 'Found' in message and 'colour' not in message:
-                    trustBeliefs[member]-=0.1
+                if isinstance(message, str) and 'Found' in message and 'colour' not in message:
+                    self._trust.contradict(member)
                     break
-        return trustBeliefs
+        return self._trust.beliefs
+
+    def get_log_data(self):
+        return {**self.get_inbox_metrics(), **self._trust.get_log_data()}
@@ -0,0 +1,48 @@
+from agents1.Trust import same_block
+
+
+class ClaimLedger:
+    """
+    Claims of team members about blocks: who said which block is at which location.
+
+    The claims are indexed by location, to check them against what the agent perceives there. Adding, checking and
+    removing a claim costs O(1).
+    """
+
+    def __init__(self):
+        self._by_location = {}  # location -> {member: block visualization}
+
+    def __len__(self):
+        return len(self._by_location)
+
+    @staticmethod
+    def is_possible(location, layout):
+        """ Returns: False if a block can never be at location: outside the grid or in a wall
+
+        Args:
+            location: claimed location
+            layout: Layout of the world
+        """
+        return layout.in_grid(location) and not layout.is_wall(location)
+
+    def add(self, member, vis, location):
+        self._by_location.setdefault(tuple(location), {})[member] = vis
+
+    def remove(self, location):
+        """ Removes the claims about location, eg because the block was picked up """
+        self._by_location.pop(tuple(location), None)
+
+    def check(self, location, vis):
+        """ Checks the claims about location against what the agent perceives there, and removes them.
+
+        Args:
+            location: perceived location
+            vis: visualization of the block perceived at location, None if there is no block
+
+        Returns: list of (member, True if the claim of member is right)
+        """
+        claims = self._by_location.get(tuple(location))
+        if claims is None:
+            return []
+        self.remove(location)
+        return [(member, vis is not None and same_block(vis, claimed)) for member, claimed in claims.items()]
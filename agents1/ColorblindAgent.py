@@ -2,6 +2,8 @@ from typing import Dict
 from agents1.GenericAgent import GenericAgent
 from agents1.Phase import Phase
 from agents1.Message import MessageType, MessageBuilder
+from agents1.Perception import state_dict
+from agents1.Records import GoalBlock, goal_blocks_from_dicts
 
 class ColorblindAgent(GenericAgent):
 
@@ -19,17 +21,18 @@ class ColorblindAgent(GenericAgent):
         block_name = "Collect_Block"
 
         for i in range(0, 3):
-            self._goal_blocks[f"block{i}"] = {
-                "visualization": state[block_name]['visualization'],
-                "location": None,
-                "id": None,
-                "drop_off": state[block_name]['location']
-            }
+            self._goal_blocks[f"block{i}"] = GoalBlock(visualization=state[block_name]['visualization'],
+                                                       drop_off=state[block_name]['location'])
 
             block_name = f"Collect_Block_{i + 1}"
 
         for goal_block in self._goal_blocks.values():
             goal_block["visualization"]["colour"] = None
+        self.index_goal_blocks()
+
+    def goal_key(self, vis):
+        """ Colours are not seen, so blocks match on (shape, size) """
+        return vis['shape'], vis['size']
 
     def filter_observations(self, state):
         """ Sets the colors of the goal blocks to None
@@ -40,27 +43,23 @@ class ColorblindAgent(GenericAgent):
         Returns:
             filtered state
         """
-        for block in state.values():
+        for block in state_dict(state).values():
             if 'class_inheritance' in block and 'CollectableBlock' in block['class_inheritance']:
                 block['visualization']['colour'] = None
 
         return state
 
     def check_surroundings_for_box(self, state):
-        blocks = [(block['visualization'], block['location'], block['obj_id']) for block in state.values() if
-                  'class_inheritance' in block and 'CollectableBlock' in block['class_inheritance']]
+        blocks = [(block['visualization'], block['location'], block['obj_id'])
+                  for block in self.perceive(state).blocks]
 
         # check if any of the found blocks are our goal block
         for block, location, obj_id in blocks:
-            for key, goal_block in self._goal_blocks.items():
-
-                if block['shape'] == goal_block['visualization']['shape'] \
-                        and block['size'] == goal_block['visualization']['size']:
-
-                    msg = self._mb.create_message(MessageType.FOUND_BLOCK,
-                                                  block_vis=block,
-                                                  location=location)
-                    self._sendMessage(msg)
+            for key in self.matching_goal_blocks(block):
+                msg = self._mb.create_message(MessageType.FOUND_BLOCK,
+                                              block_vis=block,
+                                              location=location)
+                self._sendMessage(msg)
 
     def _processMessages(self, teamMembers):
         """
@@ -71,8 +70,7 @@ class ColorblindAgent(GenericAgent):
             receivedMessages[member] = []
 
         while len(self.received_messages) != 0:
-            msg = self.received_messages.pop(0)
-            self._messages.add(msg)
+            msg = self.received_messages.popleft()
             msg = MessageBuilder.process_message(msg)
 
             for member in teamMembers:
@@ -80,15 +78,14 @@ class ColorblindAgent(GenericAgent):
                     # TODO: now, the agent assumes all messages can be trusted
                     # todo: update only if you trust the agent
                     if msg['type'] is MessageType.GOAL_BLOCKS:
-                        self._goal_blocks = msg["goal_blocks"]
+                        self._goal_blocks = goal_blocks_from_dicts(msg["goal_blocks"])
+                        self.index_goal_blocks()
                     # update goal block location
                     elif msg['type'] is MessageType.FOUND_GOAL_BLOCK:
                         # find the goal block
-                        for key, goal_block in self._goal_blocks.items():
-                            if goal_block['visualization']['shape'] == msg['visualization']['shape'] \
-                                    and goal_block['visualization']['size'] == msg['visualization']['size'] \
-                                    and goal_block['visualization']['colour'] == msg['visualization']['colour']:
-                                self.update_goal_block(key, goal_block['location'], goal_block['id'])
+                        for key in self.matching_goal_blocks(msg['visualization']):
+                            goal_block = self._goal_blocks[key]
+                            self.update_goal_block(key, goal_block['location'], goal_block['id'])
 
                     elif msg['type'] is MessageType.MOVE_TO_ROOM \
                             or msg['type'] is MessageType.SEARCHING_ROOM \
@@ -4,12 +4,18 @@ from typing import Dict
 
 from matrx.actions.door_actions import OpenDoorAction
 from matrx.actions.object_actions import GrabObject, DropObject
-from matrx.agents.agent_utils.navigator import Navigator
 from matrx.agents.agent_utils.state import State
 from matrx.agents.agent_utils.state_tracker import StateTracker
 
-from agents1.Message import MessageBuilder, MessageType
+from agents1.Claims import ClaimLedger
+from agents1.Message import MessageBuilder, MessageType, RecentContents
+from agents1.Navigation import PathNavigator, PathCache
+from agents1.Perception import Perception, vis_key
 from agents1.Phase import Phase
+from agents1.Planning import PlanningService
+from agents1.Records import GoalBlock, goal_blocks_to_dicts
+from agents1.Reservations import ReservationTable
+from agents1.Trust import TrustModel, TrustMatrix, MatrixTrustModel
 from bw4t.BW4TBrain import BW4TBrain
 
 
@@ -34,9 +40,12 @@ def closest_point_idx(point, list_of_points):
 
 class GenericAgent(BW4TBrain):
 
+    # planned paths, shared by all agents in the process
+    _path_cache = PathCache()
+
     def __init__(self, settings: Dict[str, object], phase: Phase = None):
         super().__init__(settings)
-        self._messages = set()
+        self._messages = RecentContents()  # hashes of the contents this agent sent recently
         self._door = None
         self.agent_name = None
         self._phase = phase
@@ -46,18 +55,36 @@ class GenericAgent(BW4TBrain):
         self._visited_rooms = set()
         self._com_visited_rooms = set()  # not updated rn
         self._goal_blocks = None
+        self._goal_index = {}  # goal_key of a visualization -> keys of the goal blocks that look like that
         self._filter = 'agent'
         self._searching_for = "block0"
         self._mb = None  # message builder
         self._previous_phase = None
         self._is_carrying = set()
+        self._perception = None  # index of the objects perceived in the current tick
+        # send messages as Packet instead of text, only for teams of agents that all read Packets
+        self._structured_messages = self.get_setting('structured_messages')
+        self._trust = TrustModel()
+        # keep trust in the TrustMatrix of the team instead of in this agent
+        self._use_trust_matrix = self.get_setting('trust_matrix')
+        self._trust_matrix = None
+        # backend of plan_path, see Navigation.PLANNERS
+        self._planner = self.get_setting('planner')
+        # hand in paths to the PlanningService of the layout, planned on the grid together with those of other agents
+        self._batched_planning = self.get_setting('batched_planning')
+        self._planning = None
+        # plan paths around the other agents of the team with the ReservationTable of the team
+        self._use_reservations = self.get_setting('reservations')
+        self._reservations = None
+        # blocks that team members said they found
+        self._claims = ClaimLedger()
 
     def initialize(self):
         super().initialize()
-        self._mb = MessageBuilder(self.agent_name)
+        self._mb = MessageBuilder(self.agent_name, self._structured_messages)
         self._state_tracker = StateTracker(agent_id=self.agent_id)
-        self._navigator = Navigator(agent_id=self.agent_id,
-                                    action_set=self.action_set, algorithm=Navigator.A_STAR_ALGORITHM)
+        # paths are planned on the static layout, shared by all agents
+        self._navigator = PathNavigator(agent_id=self.agent_id, action_set=self.action_set, planner=self._planner)
 
     def filter_observations(self, state):
         return state
@@ -74,7 +101,7 @@ class GenericAgent(BW4TBrain):
         self._state_tracker.update(state)
         # Follow path to door
         action = self._navigator.get_move_action(self._state_tracker)
-        if action is not None:
+        if action is not None or self._navigator.is_waiting:
             return action, {}
 
         self.update_phase(phase)
@@ -94,14 +121,53 @@ class GenericAgent(BW4TBrain):
             coord = [coord]
 
         self._navigator.reset_full()
-        # add waypoint to the block
-        self._navigator.add_waypoints(coord)
+        if self._batched_planning and not self._navigator.plans_legs:
+            if self._planning is None:
+                self._planning = PlanningService.of(self._navigator.layout(self.state))
+            start = self.state[self.agent_id]['location']
+            self._navigator.add_request(self._planning.request(start, coord))
+        else:
+            # add the tiles of the path through all coordinates as waypoints
+            self._navigator.add_waypoints(self.path_through(coord))
 
         # follow path to block
         self.update_phase(phase)
 
         return None, {}
 
+    def path_through(self, coord):
+        """ Plans the path from the agent's location through the coordinates, using the shared path cache.
+
+        Args:
+            coord: list of coordinates that the agent has to visit
+
+        Returns: list of locations on the path. If a coordinate can't be reached, the coordinate itself is in the list
+        """
+        if self._navigator.plans_legs:
+            # the navigator plans the path to each coordinate itself
+            return [tuple(goal) for goal in coord]
+        layout = self._navigator.layout(self.state)
+        open_doors = layout.open_doors()
+        start = tuple(self.state[self.agent_id]['location'])
+        path = []
+        for goal in coord:
+            goal = tuple(goal)
+            leg = self._path_cache.get(layout, start, goal, open_doors)
+            if leg is None:
+                leg = self._navigator.plan(start, goal)
+                self._path_cache.put(layout, start, goal, open_doors, leg)
+            path.extend(leg if len(leg) > 0 else [goal])
+            start = goal
+        return path
+
+    def get_log_data(self):
+        data = {**self._path_cache.get_log_data(), **self._navigator.get_log_data(),
+                **MessageBuilder.parse_cache.get_log_data(),
+                **self.get_inbox_metrics(), **self._trust.get_log_data()}
+        if self._planning is not None:
+            data.update(self._planning.get_log_data())
+        return data
+
     def find_action(self, state):
         # returns an action based on the following ranking:
         #   1. if goal block has been located, start going in its direction
@@ -143,24 +209,27 @@ class GenericAgent(BW4TBrain):
                 * 'agent': only rooms that the agent has not visited
                 * 'everyone': only rooms that no one has visited
         """
-        all_doors = [door for door in state.values()
-                     if 'class_inheritance' in door and 'Door' in door['class_inheritance']]
+        doors = self.perceive(state).doors(open)
 
-        doors = None
-        if filter == 'none':
-            doors = all_doors
         if filter == 'agent':
-            doors = [door for door in all_doors if door['room_name'] not in self._visited_rooms]
+            return [door for door in doors if door['room_name'] not in self._visited_rooms]
         if filter == 'everyone':
-            doors = [door for door in all_doors
-                     if door['room_name'] not in self._visited_rooms
-                     and door['room_name'] not in self._com_visited_rooms]
-        if open:
-            return [door for door in doors
-                    if door['is_open']]
-        else:
             return [door for door in doors
-                    if not door['is_open']]
+                    if door['room_name'] not in self._visited_rooms
+                    and door['room_name'] not in self._com_visited_rooms]
+        return list(doors)
+
+    def perceive(self, state):
+        """ Returns the index of the objects in state, built once per tick in decide_on_bw4t_action.
+
+        Args:
+            state: matrx state perceived by the agent
+
+        Returns: Perception of the state
+        """
+        if self._perception is None:
+            self._perception = Perception(state)
+        return self._perception
 
     def plan_path_to_closed_door(self, state, phase: Phase):
         """ Finds doors that are still closed and plans a path to them
@@ -257,7 +326,7 @@ class GenericAgent(BW4TBrain):
 
         return self.plan_path([above_doors, right, left_left], phase)
 
-    def search_room(self, state):
+    def search_room(self, state, phase=None):
         """ Looks for any blocks in radius of the agent, if blocks match any goal block, records it's location and id.
             After each search agent moves to the waypoint given by @plan_room_search.
         Args:
@@ -275,7 +344,7 @@ class GenericAgent(BW4TBrain):
 
         action = self._navigator.get_move_action(self._state_tracker)
 
-        if action is not None:
+        if action is not None or self._navigator.is_waiting:
             return action, {}
 
         self._visited_rooms.add(self._door['room_name'])
@@ -339,18 +408,30 @@ class GenericAgent(BW4TBrain):
         block_name = "Collect_Block"
 
         for i in range(0, 3):
-            self._goal_blocks[f"block{i}"] = {
-                "visualization": state[block_name]['visualization'],
-                "location": None,
-                "id": None,
-                "drop_off": state[block_name]['location']
-            }
+            self._goal_blocks[f"block{i}"] = GoalBlock(visualization=state[block_name]['visualization'],
+                                                       drop_off=state[block_name]['location'])
 
             block_name = f"Collect_Block_{i + 1}"
 
-        self._sendMessage(self._mb.create_message(MessageType.GOAL_BLOCKS, goal_blocks=self._goal_blocks))
+        self.index_goal_blocks()
+        self._sendMessage(self._mb.create_message(MessageType.GOAL_BLOCKS,
+                                                  goal_blocks=goal_blocks_to_dicts(self._goal_blocks)))
         self._grid_shape = state['World']['grid_shape']
 
+    def goal_key(self, vis):
+        """ Returns: the key of a block visualization in the goal block index, the blocks with equal keys match """
+        return vis_key(vis)
+
+    def index_goal_blocks(self):
+        """ Indexes the goal blocks by goal_key of their visualization. Call it whenever _goal_blocks is replaced. """
+        self._goal_index = {}
+        for key, goal_block in self._goal_blocks.items():
+            self._goal_index.setdefault(self.goal_key(goal_block['visualization']), []).append(key)
+
+    def matching_goal_blocks(self, vis):
+        """ Returns: list with the keys of the goal blocks that match the block visualization """
+        return self._goal_index.get(self.goal_key(vis), [])
+
     def phase_action(self, state):
         msg = None
 
@@ -409,25 +490,36 @@ class GenericAgent(BW4TBrain):
         return res, msg
 
     def check_surroundings_for_box(self, state):
-        blocks = [(block['visualization'], block['location'], block['obj_id']) for block in state.values() if
-                  'class_inheritance' in block and 'CollectableBlock' in block['class_inheritance']]
-
-        # check if any of the found blocks are our goal block
-        for block, location, obj_id in blocks:
-            for key, goal_block in self._goal_blocks.items():
-
-                if block['colour'] == goal_block['visualization']['colour'] \
-                        and block['shape'] == goal_block['visualization']['shape'] \
-                        and block['size'] == goal_block['visualization']['size']:
-                    self.update_goal_block(key, location, obj_id)
+        # check if any of the found blocks are our goal block, once for all blocks that look the same
+        for blocks in self.perceive(state).blocks_by_vis.values():
+            for key in self.matching_goal_blocks(blocks[0]['visualization']):
+                for block in blocks:
+                    self.update_goal_block(key, block['location'], block['obj_id'])
                     msg = self._mb.create_message(MessageType.FOUND_GOAL_BLOCK,
                                                   block_vis=self._goal_blocks[key]["visualization"],
-                                                  location=location)
+                                                  location=block['location'])
                     self._sendMessage(msg)
 
     def decide_on_bw4t_action(self, state: State):
+        # index the perceived objects once, the phases below look them up
+        self._perception = Perception(state)
+
         if self._goal_blocks is None:
             self.initialize_state(state)
+            if self._use_trust_matrix:
+                self._trust_matrix = TrustMatrix.of(state['World']['world_ID'], state['World']['team_members'],
+                                                    state['World']['nr_ticks'])
+                self._trust = MatrixTrustModel(self._trust_matrix, self.agent_name)
+            if self._use_reservations:
+                self._reservations = ReservationTable.of(state['World']['world_ID'], state['World']['nr_ticks'])
+                # a move blocks the agent for its slowdown, it acts again in the tick after that
+                self._reservations.add_agent(self.agent_id, self.get_setting('slowdown') + 1)
+                self._navigator.reservations = self._reservations
+        if self._trust_matrix is not None:
+            self._trust_matrix.advance(state['World']['nr_ticks'])
+        if self._reservations is not None:
+            self._reservations.advance(state['World']['nr_ticks'])
+            self._navigator.stand(tuple(state[self.agent_id]['location']), state['World']['nr_ticks'])
 
         self.check_surroundings_for_box(state)
 
@@ -467,8 +559,7 @@ class GenericAgent(BW4TBrain):
             receivedMessages[member] = []
 
         while len(self.received_messages) != 0:
-            msg = self.received_messages.pop(0)
-            self._messages.add(msg)
+            msg = self.received_messages.popleft()
             msg = MessageBuilder.process_message(msg)
 
             for member in teamMembers:
@@ -478,11 +569,9 @@ class GenericAgent(BW4TBrain):
                     # update goal block location
                     if msg['type'] is MessageType.FOUND_GOAL_BLOCK:
                         # find the goal block
-                        for key, goal_block in self._goal_blocks.items():
-                            if goal_block['visualization']['shape'] == msg['visualization']['shape'] \
-                                    and goal_block['visualization']['size'] == msg['visualization']['size'] \
-                                    and goal_block['visualization']['colour'] == msg['visualization']['colour']:
-                                self.update_goal_block(key, goal_block['location'], goal_block['id'])
+                        for key in self.matching_goal_blocks(msg['visualization']):
+                            goal_block = self._goal_blocks[key]
+                            self.update_goal_block(key, goal_block['location'], goal_block['id'])
 
                     elif msg['type'] is MessageType.MOVE_TO_ROOM \
                             or msg['type'] is MessageType.SEARCHING_ROOM \
@@ -499,19 +588,42 @@ class GenericAgent(BW4TBrain):
 
     def _trustBlief(self, member, received):
         """
-        Baseline implementation of a trust belief. Creates a dictionary with trust belief scores for each team member, for example based on the received messages.
+        Updates the trust beliefs in the team members with the received messages and with what the agent perceives.
+        Blocks that members say they found are kept in the claim ledger, the member is trusted more if the agent sees
+        the block there and less if the agent stands on the location and the block is not there. Claims of blocks
+        outside the grid or in a wall are impossible, they are not kept and the member is trusted less right away.
+
+        Returns: dict with the trust score of each team member
         """
-        # You can change the default value to your preference
-        default = 0.5
-        trustBeliefs = {}
-        for member in received.keys():
-            trustBeliefs[member] = default
-        for member in received.keys():
-            for message in received[member]:
-                if 'Found' in message and 'colour' not in message:
-                    trustBeliefs[member] -= 0.1
-                    break
-        return trustBeliefs
+        for member, messages in received.items():
+            self._trust.add_member(member)
+            for message in messages:
+                if message.get('type') in (MessageType.FOUND_GOAL_BLOCK, MessageType.FOUND_BLOCK):
+                    if ClaimLedger.is_possible(message['location'], self._navigator.layout(self.state)):
+                        self._claims.add(member, message['visualization'], message['location'])
+                    else:
+                        self._trust.contradict(member)
+                elif message.get('type') is MessageType.PICK_UP_BLOCK:
+                    # the block was taken away, that does not make the claim a lie
+                    self._claims.remove(message['location'])
+
+        self._check_claims()
+        return self._trust.beliefs
+
+    def _check_claims(self):
+        """ Confirms or contradicts the claims about the locations the agent perceives. """
+        if len(self._claims) == 0:
+            return
+        for block in self._perception.blocks:
+            for member, is_right in self._claims.check(block['location'], block['visualization']):
+                if is_right:
+                    self._trust.confirm(member)
+                else:
+                    self._trust.contradict(member)
+
+        # an unconfirmed claim on the tile of the agent is false
+        for member, _ in self._claims.check(self.state[self.agent_id]['location'], None):
+            self._trust.contradict(member)
 
     def update_phase(self, phase):
         self._previous_phase = self._phase
@@ -0,0 +1,119 @@
+import heapq
+
+from agents1.JumpPoint import chebyshev
+from agents1.Layout import UNREACHABLE
+
+
+class DStarLite:
+    """
+    D* Lite search towards one goal on a Layout, kept between plans and repaired instead of planned again.
+
+    The search runs backwards from the goal, so g holds the moves from each expanded tile to the goal. When the agent
+    has moved, only the heuristic offset km changes. When doors of the layout opened or closed since the last plan,
+    only those tiles and their neighbours are updated, and the search expands just the tiles whose distance changes
+    and that matter for the path from the agent. A door far from the path costs a few heap operations.
+    """
+
+    def __init__(self, layout, goal):
+        self._layout = layout
+        self.goal = tuple(goal)
+        self._g = {}
+        self._rhs = {self.goal: 0}
+        self._queue = []  # heap of (key, location), may hold outdated entries
+        self._keys = {}  # location -> key of its entry in the queue
+        self._km = 0
+        self._last = None  # start of the previous plan
+        self._version = layout.version  # changes of the layout that were applied
+        self.expansions = 0
+
+    def _key(self, loc):
+        dist = min(self._g.get(loc, UNREACHABLE), self._rhs.get(loc, UNREACHABLE))
+        return dist + chebyshev(self._last, loc) + self._km, dist
+
+    def _push(self, loc):
+        key = self._key(loc)
+        self._keys[loc] = key
+        heapq.heappush(self._queue, (key, loc))
+
+    def _top(self):
+        """ Returns: (key, location) of the first entry in the queue that is up to date, or None """
+        while self._queue:
+            key, loc = self._queue[0]
+            if self._keys.get(loc) == key:
+                return key, loc
+            heapq.heappop(self._queue)
+        return None
+
+    def _update(self, loc):
+        """ Recomputes rhs of loc from its neighbours, and queues loc if it is inconsistent """
+        if loc != self.goal:
+            if self._layout.is_traversable(loc):
+                self._rhs[loc] = min([self._g.get(n, UNREACHABLE) for n in self._layout.neighbours(loc)],
+                                     default=UNREACHABLE) + 1
+            else:
+                self._rhs[loc] = UNREACHABLE
+        self._keys.pop(loc, None)
+        if self._g.get(loc, UNREACHABLE) != self._rhs.get(loc, UNREACHABLE):
+            self._push(loc)
+
+    def _compute(self, start):
+        while True:
+            top = self._top()
+            start_key = self._key(start)
+            if top is None or (top[0] >= start_key
+                               and self._rhs.get(start, UNREACHABLE) == self._g.get(start, UNREACHABLE)):
+                return
+            key, loc = top
+            new_key = self._key(loc)
+            if key < new_key:
+                self._push(loc)
+                continue
+            heapq.heappop(self._queue)
+            del self._keys[loc]
+            self.expansions += 1
+            if self._g.get(loc, UNREACHABLE) > self._rhs[loc]:
+                self._g[loc] = self._rhs[loc]
+            else:
+                self._g[loc] = UNREACHABLE
+                self._update(loc)
+            for n in self._layout.neighbours(loc):
+                self._update(n)
+
+    def is_changed(self):
+        """ Returns: True if doors of the layout opened or closed since the previous plan, so the next plan repairs
+        the search
+        """
+        return self._layout.version != self._version
+
+    def path(self, start):
+        """ Returns: list of locations from start (exclusive) to the goal (inclusive), empty if there is no path """
+        start = tuple(start)
+        if start == self.goal or not self._layout.is_traversable(self.goal):
+            return []
+        if self._last is None:
+            self._last = start
+            self._push(self.goal)
+        elif start != self._last:
+            self._km += chebyshev(self._last, start)
+            self._last = start
+        for loc in self._layout.changes_since(self._version):
+            self._update(loc)
+            for n in self._layout.neighbours(loc):
+                self._update(n)
+        self._version = self._layout.version
+        self._compute(start)
+
+        path = []
+        loc = start
+        while loc != self.goal:
+            dist = self._g.get(loc, UNREACHABLE)
+            if dist == UNREACHABLE:
+                return []
+            loc = min(self._layout.neighbours(loc), key=lambda n: self._g.get(n, UNREACHABLE))
+            if self._g.get(loc, UNREACHABLE) != dist - 1:
+                # the tiles further on are not consistent yet, continue the search from here
+                self._compute(loc)
+                if self._g.get(loc, UNREACHABLE) != dist - 1:
+                    return []
+            path.append(loc)
+        return path
@@ -0,0 +1,133 @@
+import heapq
+
+
+def chebyshev(loc, other):
+    """ Returns: number of moves between loc and other on an open grid, diagonal moves allowed """
+    return max(abs(loc[0] - other[0]), abs(loc[1] - other[1]))
+
+
+class JumpPointSearch:
+    """
+    Jump Point Search on a Layout: A* that only expands the tiles where the best path may turn.
+
+    From a tile the search jumps in a straight or diagonal line over the open tiles until it reaches the goal or a
+    tile with a forced neighbour (a neighbour that is only reached in the shortest way through this tile because a
+    wall or closed door is next to it). In the open hallways of BW4T this skips most tiles that A* would expand.
+    Every move costs 1, as for the agents, so the heuristic is the chebyshev distance.
+    Nothing is precomputed, so a plan always sees the current doors of the layout.
+    """
+
+    # JumpPointSearch of each Layout in this process
+    _searches = {}
+
+    def __init__(self, layout):
+        self._layout = layout
+        self.expansions = 0  # nr of jump points expanded by all searches
+
+    @staticmethod
+    def of(layout):
+        """ Returns: the JumpPointSearch of layout, shared with other agents on the same layout """
+        if layout not in JumpPointSearch._searches:
+            JumpPointSearch._searches[layout] = JumpPointSearch(layout)
+        return JumpPointSearch._searches[layout]
+
+    def _open(self, x, y):
+        return self._layout.is_traversable((x, y))
+
+    def path(self, start, goal):
+        """ Returns: list of locations from start (exclusive) to goal (inclusive), empty if there is no path """
+        start, goal = tuple(start), tuple(goal)
+        if start == goal or not self._layout.is_traversable(goal):
+            return []
+
+        g = {start: 0}
+        parent = {start: None}
+        heap = [(chebyshev(start, goal), 0, start)]
+        while heap:
+            _, cost, loc = heapq.heappop(heap)
+            if cost > g[loc]:
+                continue
+            if loc == goal:
+                return self._tiles(goal, parent)
+            self.expansions += 1
+            for dx, dy in self._directions(loc, parent[loc]):
+                jump_point = self._jump(loc[0], loc[1], dx, dy, goal)
+                if jump_point is None:
+                    continue
+                jump_cost = cost + chebyshev(loc, jump_point)
+                if jump_cost < g.get(jump_point, jump_cost + 1):
+                    g[jump_point] = jump_cost
+                    parent[jump_point] = loc
+                    heapq.heappush(heap, (jump_cost + chebyshev(jump_point, goal), jump_cost, jump_point))
+        return []
+
+    def _directions(self, loc, parent):
+        """ Returns: the directions to search from loc when it was reached from parent """
+        if parent is None:
+            return [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx != 0 or dy != 0]
+        x, y = loc
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        if dx != 0 and dy != 0:
+            directions = [(dx, dy), (dx, 0), (0, dy)]
+            if not self._open(x - dx, y):
+                directions.append((-dx, dy))
+            if not self._open(x, y - dy):
+                directions.append((dx, -dy))
+        elif dx != 0:
+            directions = [(dx, 0)]
+            if not self._open(x, y + 1):
+                directions.append((dx, 1))
+            if not self._open(x, y - 1):
+                directions.append((dx, -1))
+        else:
+            directions = [(0, dy)]
+            if not self._open(x + 1, y):
+                directions.append((1, dy))
+            if not self._open(x - 1, y):
+                directions.append((-1, dy))
+        return directions
+
+    def _jump(self, x, y, dx, dy, goal):
+        """ Returns: the first jump point from (x, y) in direction (dx, dy), or None if there is none """
+        while True:
+            x += dx
+            y += dy
+            if not self._open(x, y):
+                return None
+            if (x, y) == goal:
+                return x, y
+            if dx != 0 and dy != 0:
+                if (self._open(x - dx, y + dy) and not self._open(x - dx, y)) \
+                        or (self._open(x + dx, y - dy) and not self._open(x, y - dy)):
+                    return x, y
+                # a diagonal jump stops where a straight jump finds a jump point
+                if self._jump(x, y, dx, 0, goal) is not None or self._jump(x, y, 0, dy, goal) is not None:
+                    return x, y
+            elif dx != 0:
+                if (self._open(x + dx, y + 1) and not self._open(x, y + 1)) \
+                        or (self._open(x + dx, y - 1) and not self._open(x, y - 1)):
+                    return x, y
+            else:
+                if (self._open(x + 1, y + dy) and not self._open(x + 1, y)) \
+                        or (self._open(x - 1, y + dy) and not self._open(x - 1, y)):
+                    return x, y
+
+    @staticmethod
+    def _tiles(goal, parent):
+        """ Returns: all tiles of the path through the jump points, start excluded """
+        path = []
+        loc = goal
+        while parent[loc] is not None:
+            prev = parent[loc]
+            dx = (loc[0] > prev[0]) - (loc[0] < prev[0])
+            dy = (loc[1] > prev[1]) - (loc[1] < prev[1])
+            segment = []
+            tile = loc
+            while tile != prev:
+                segment.append(tile)
+                tile = (tile[0] - dx, tile[1] - dy)
+            path.extend(segment)
+            loc = prev
+        path.reverse()
+        return path
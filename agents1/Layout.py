@@ -0,0 +1,203 @@
+from collections import deque
+
+from agents1.Perception import state_dict, is_agent
+
+# Possible moves of an agent, straight moves first so that paths prefer them over diagonal ones
+MOVES = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+# Distance of tiles that can not reach the target
+UNREACHABLE = float('inf')
+
+
+def is_door(obj):
+    return 'class_inheritance' in obj and 'Door' in obj['class_inheritance']
+
+
+class Layout:
+    """
+    The static map of a BW4T world as perceived by the agents: walls and doors.
+
+    The layout keeps a BFS distance field for each target that was asked for (door fronts, room tiles, drop tiles,
+    ...). A field is computed once and then shared by all agents in the process that perceive the same map, so that
+    finding the next step towards a target is a lookup. When a door opens the existing fields are repaired
+    incrementally instead of being recomputed.
+    """
+
+    # All layouts created in this process, by (grid shape, walls, doors)
+    _layouts = {}
+
+    def __init__(self, grid_shape, walls, doors):
+        """
+        Args:
+            grid_shape: (width, height) of the world
+            walls: set of locations that are never traversable
+            doors: dict with the location of each door as key and its object id as value. Doors start closed.
+        """
+        self.width, self.height = grid_shape
+        self._traversable = [True] * (self.width * self.height)
+        for x, y in walls:
+            self._traversable[self._idx((x, y))] = False
+        self._doors = dict(doors)
+        self._open_doors = set()
+        for loc in self._doors:
+            self._traversable[self._idx(loc)] = False
+
+        # target location -> flat list with for each tile the number of moves to the target
+        self._fields = {}
+        self.expansions = 0  # nr of tiles expanded by all BFS runs, for comparing planners
+        self._changes = []  # locations of the doors that opened or closed, in order
+
+    @staticmethod
+    def of(state):
+        """ Returns the layout of the world perceived in the state, shared with other agents that perceive the same map.
+
+        Args:
+            state: matrx state perceived by the agent, or the memorized state of a state tracker
+
+        Returns: Layout, with the doors updated to the state
+        """
+        state = state_dict(state)
+        walls = set()
+        doors = {}
+        for obj_id, obj in state.items():
+            if obj_id == 'World' or 'is_traversable' not in obj:
+                continue
+            if is_door(obj):
+                doors[tuple(obj['location'])] = obj_id
+            elif not obj['is_traversable'] and not is_agent(obj):
+                walls.add(tuple(obj['location']))
+
+        key = (tuple(state['World']['grid_shape']), frozenset(walls), frozenset(doors.items()))
+        if key not in Layout._layouts:
+            Layout._layouts[key] = Layout(key[0], walls, doors)
+        layout = Layout._layouts[key]
+        layout.update_doors(state)
+        return layout
+
+    def _idx(self, loc):
+        return loc[1] * self.width + loc[0]
+
+    def in_grid(self, loc):
+        return 0 <= loc[0] < self.width and 0 <= loc[1] < self.height
+
+    def is_traversable(self, loc):
+        return self.in_grid(loc) and self._traversable[self._idx(loc)]
+
+    def is_wall(self, loc):
+        """ Returns: True if loc is a tile that is never traversable """
+        return self.in_grid(loc) and not self._traversable[self._idx(loc)] and tuple(loc) not in self._doors
+
+    def door_locations(self):
+        """ Returns: list with the locations of all doors """
+        return list(self._doors)
+
+    def open_doors(self):
+        """ Returns: frozenset with the locations of the open doors """
+        return frozenset(self._open_doors)
+
+    @property
+    def version(self):
+        """ Returns: number of door changes so far, to pass to changes_since later """
+        return len(self._changes)
+
+    def changes_since(self, version):
+        """ Returns: list with the locations of the doors that opened or closed after version """
+        return self._changes[version:]
+
+    def update_doors(self, state):
+        """ Updates the open/closed state of the doors to the state perceived by an agent.
+
+        Args:
+            state: matrx state perceived by the agent
+        """
+        state = state_dict(state)
+        for loc, door_id in self._doors.items():
+            if door_id not in state:
+                continue
+            is_open = state[door_id]['is_open']
+            if is_open and loc not in self._open_doors:
+                self._open(loc)
+            elif not is_open and loc in self._open_doors:
+                self._close(loc)
+
+    def _open(self, loc):
+        """ Makes the door at loc traversable and repairs all distance fields.
+
+        Distances can only get shorter, so starting from the door each field is relaxed
+        only where the door gives a shorter way.
+        """
+        self._open_doors.add(loc)
+        self._changes.append(loc)
+        door = self._idx(loc)
+        self._traversable[door] = True
+        for target, field in self._fields.items():
+            best = min([field[self._idx(n)] for n in self.neighbours(loc)], default=UNREACHABLE) + 1
+            if loc == target:
+                best = 0
+            if best >= field[door]:
+                continue
+            field[door] = best
+            self._relax(field, deque([loc]))
+
+    def _close(self, loc):
+        """ Makes the door at loc intraversable. Distances may get longer, so the fields are computed again. """
+        self._open_doors.discard(loc)
+        self._changes.append(loc)
+        self._traversable[self._idx(loc)] = False
+        self._fields = {}
+
+    def neighbours(self, loc):
+        """ Returns: list of traversable locations one move away from loc """
+        x, y = loc
+        return [(x + dx, y + dy) for dx, dy in MOVES if self.is_traversable((x + dx, y + dy))]
+
+    def _relax(self, field, queue):
+        """ Breadth first propagation of the distances of the locations in queue to their neighbours. """
+        while queue:
+            loc = queue.popleft()
+            self.expansions += 1
+            dist = field[self._idx(loc)] + 1
+            for n in self.neighbours(loc):
+                if dist < field[self._idx(n)]:
+                    field[self._idx(n)] = dist
+                    queue.append(n)
+
+    def field(self, target):
+        """ Returns the distance field of target: a flat list with for each tile the number of moves to the target.
+        Computed on first use.
+        """
+        target = tuple(target)
+        if target not in self._fields:
+            field = [UNREACHABLE] * (self.width * self.height)
+            if self.is_traversable(target):
+                field[self._idx(target)] = 0
+                self._relax(field, deque([target]))
+            self._fields[target] = field
+        return self._fields[target]
+
+    def distance(self, loc, target):
+        """ Returns: number of moves from loc to target, UNREACHABLE if there is no path """
+        if not self.in_grid(loc) or not self.in_grid(target):
+            return UNREACHABLE
+        return self.field(target)[self._idx(loc)]
+
+    def next_step(self, loc, target):
+        """ Returns: the location one move closer to target, or None if loc is the target or target can't be reached.
+        """
+        dist = self.distance(loc, target)
+        if dist == UNREACHABLE or dist == 0:
+            return None
+        field = self.field(target)
+        for n in self.neighbours(loc):
+            if field[self._idx(n)] == dist - 1:
+                return n
+        return None
+
+    def path(self, start, goal):
+        """ Returns: list of locations from start (exclusive) to goal (inclusive), empty if there is no path """
+        path = []
+        loc = self.next_step(tuple(start), goal)
+        while loc is not None:
+            path.append(loc)
+            loc = self.next_step(loc, goal)
+        return path
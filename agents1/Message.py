@@ -1,6 +1,8 @@
 import enum
 import json
 import re
+import sys
+from collections import OrderedDict
 
 from matrx.messages.message import Message
 
@@ -18,19 +20,178 @@ class MessageType(enum.Enum):
     FOUND_GOAL_BLOCK = 6,
     DROP_BLOCK = 7
 
+
+# Leading text of the content of each message type, see MessageBuilder.create_message
+MESSAGE_PREFIXES = {
+    "Opening door of ": MessageType.OPEN_DOOR,
+    "Dropped goal block ": MessageType.DROP_BLOCK,
+    "Picking up goal block ": MessageType.PICK_UP_BLOCK,
+    "Moving to ": MessageType.MOVE_TO_ROOM,
+    "Searching through ": MessageType.SEARCHING_ROOM,
+    "Found goal block ": MessageType.FOUND_GOAL_BLOCK,
+    "Found block ": MessageType.FOUND_BLOCK,
+    "Goal blocks ": MessageType.GOAL_BLOCKS,
+}
+
+
+# Leading text of room names, the room index in a Packet is the number after it
+ROOM_PREFIX = "room_"
+
+# Interned block visualizations: (size, shape, colour) -> id, and id -> (size, shape, colour)
+_vis_ids = {}
+_vis_by_id = []
+
+
+def intern_vis(block_vis):
+    """
+    Takes in a block visualization dict and returns its id, which is the same for every equal visualization in the
+    process.
+    """
+    key = (block_vis['size'], block_vis['shape'], block_vis['colour'])
+    vis_id = _vis_ids.get(key)
+    if vis_id is None:
+        vis_id = len(_vis_by_id)
+        _vis_ids[key] = vis_id
+        _vis_by_id.append(key)
+    return vis_id
+
+
+def vis_of(vis_id):
+    """
+    Takes in an interned visualization id and returns a new block visualization dict.
+    """
+    size, shape, colour = _vis_by_id[vis_id]
+    return {'size': size, 'shape': shape, 'colour': colour}
+
+
+def pack_location(location):
+    """
+    Packs a location into a single int: x in the high bits, y in the low 16 bits.
+    Grid locations are never negative, y must be below 2**16.
+    """
+    if location[0] < 0 or not 0 <= location[1] <= 0xFFFF:
+        raise ValueError("Can't pack location ", location)
+    return (location[0] << 16) | location[1]
+
+
+def unpack_location(packed):
+    return packed >> 16, packed & 0xFFFF
+
+
+class Packet(tuple):
+    """
+    Structured content of a message: (MessageType, room index, interned visualization id, packed location).
+    Fields that the message type does not use are None.
+
+    Agents that agree on packets read them without parsing any text. str() of a packet gives the human-readable
+    string of the protocol, and Packet.from_str reads such a string back, so a packet converts to text and back
+    without loss. GOAL_BLOCKS messages carry a whole dict and are always sent as text.
+    """
+    __slots__ = ()
+
+    def __new__(cls, mt, room=None, vis=None, location=None):
+        return tuple.__new__(cls, (mt, room, vis, location))
+
+    @property
+    def type(self):
+        return self[0]
+
+    @property
+    def room_name(self):
+        return None if self[1] is None else ROOM_PREFIX + str(self[1])
+
+    @property
+    def visualization(self):
+        return None if self[2] is None else vis_of(self[2])
+
+    @property
+    def location(self):
+        return None if self[3] is None else unpack_location(self[3])
+
+    @staticmethod
+    def of(mt, room_name=None, block_vis=None, location=None):
+        """
+        Creates a packet from the same parameters as MessageBuilder.create_message
+        """
+        return Packet(mt,
+                      None if room_name is None else int(room_name[len(ROOM_PREFIX):]),
+                      None if block_vis is None else intern_vis(block_vis),
+                      None if location is None else pack_location(location))
+
+    @staticmethod
+    def from_str(content):
+        """
+        Reads the human-readable string of a message into a packet.
+
+        @param content: message content following the string protocol
+        @return: Packet, or None if the content is not a message that can be a packet.
+        """
+        mt = message_type(content)
+        if mt is None or mt is MessageType.GOAL_BLOCKS:
+            return None
+        if mt in (MessageType.OPEN_DOOR, MessageType.MOVE_TO_ROOM, MessageType.SEARCHING_ROOM):
+            return Packet.of(mt, room_name=extract_room(content))
+        block_vis = extract_block_vis(content)
+        # block_vis_str writes an unknown colour as "None"
+        if block_vis['colour'] == "None":
+            block_vis['colour'] = None
+        return Packet.of(mt, block_vis=block_vis, location=extract_location(content))
+
+    def __str__(self):
+        return message_text(self.type, self.room_name, self.visualization, self.location)
+
+    def __repr__(self):
+        return 'Packet' + tuple.__repr__(self)
+
+
+def _first_words(content):
+    """ Returns: the first two words of content, which identify the message type """
+    end = content.find(' ', content.find(' ') + 1)
+    return content if end < 0 else content[:end]
+
+
+# First two words of the content -> (prefix, MessageType), so the type of a message is found with one lookup
+_PREFIX_TABLE = {_first_words(prefix): (prefix, mt) for prefix, mt in MESSAGE_PREFIXES.items()}
+
+
+def _find_prefix(content):
+    """ Returns: (prefix, MessageType) of the content, or None if the content does not follow the protocol """
+    entry = _PREFIX_TABLE.get(_first_words(content))
+    if entry is None or not content.startswith(entry[0]):
+        return None
+    return entry
+
+
+def message_type(content):
+    """
+    Takes in message content and returns its MessageType, or None if the content does not follow the protocol.
+    """
+    if isinstance(content, Packet):
+        return content.type
+    if not isinstance(content, str):
+        return None
+    entry = _find_prefix(content)
+    return None if entry is None else entry[1]
+
+
+_VIS_PATTERN = re.compile("{.*}")
+_LOCATION_PATTERN = re.compile("\\(.*\\)")
+_ROOM_PATTERN = re.compile(ROOM_PREFIX + "\\d+")
+
+
 def extract_goal_blocks(content):
-    vis = re.findall("{.*}", content)  # find block visualization
+    vis = _VIS_PATTERN.search(content).group()  # find block visualization
 
-    vis = json.loads(vis[0])  # cast string to dict
+    vis = json.loads(vis)  # cast string to dict
     return vis
 
 def extract_block_vis(content):
     """
     Takes in message content and returns the block visualization (if message contains it).
     """
-    vis = re.findall("{.*}", content)  # find block visualization
+    vis = _VIS_PATTERN.search(content).group()  # find block visualization
 
-    vis = json.loads(vis[0])  # cast string to dict
+    vis = json.loads(vis)  # cast string to dict
     return vis
 
 
@@ -38,8 +199,7 @@ def extract_location(content):
     """
     Takes in message content and returns the location (if message contains it).
     """
-    loc = re.findall("\(.*\)", content)  # find location
-    loc = loc[0]
+    loc = _LOCATION_PATTERN.search(content).group()  # find location
 
     location = (int(loc[1: loc.find(',')]),
                 int(loc[loc.find(',') + 2: loc.find(')')]))  # parse string to tuple
@@ -49,10 +209,34 @@ def extract_location(content):
 
 def extract_room(content):
     """
-    Takes in message content and returns the room name (if message contains it).
+    Takes in message content and returns the room name (if message contains it), eg room_3 or room_120.
     """
-    room_name = re.findall("(room_\d)", content)
-    return room_name[0]
+    return _ROOM_PATTERN.search(content).group()
+
+
+def _parse_room(content):
+    return {'room_name': extract_room(content)}
+
+
+def _parse_block(content):
+    return {'visualization': extract_block_vis(content), 'location': extract_location(content)}
+
+
+def _parse_goal_blocks(content):
+    return {'goal_blocks': extract_goal_blocks(content)}
+
+
+# Parser of the content of each message type, gives the fields of process_message besides 'from_id' and 'type'
+PARSERS = {
+    MessageType.OPEN_DOOR: _parse_room,
+    MessageType.DROP_BLOCK: _parse_block,
+    MessageType.PICK_UP_BLOCK: _parse_block,
+    MessageType.MOVE_TO_ROOM: _parse_room,
+    MessageType.SEARCHING_ROOM: _parse_room,
+    MessageType.FOUND_GOAL_BLOCK: _parse_block,
+    MessageType.FOUND_BLOCK: _parse_block,
+    MessageType.GOAL_BLOCKS: _parse_goal_blocks,
+}
 
 
 def block_vis_str(block_vis):
@@ -81,6 +265,140 @@ def location_str(location):
     return res
 
 
+def message_text(mt, room_name=None, block_vis=None, location=None, goal_blocks=None):
+    """
+    Method returns the string content of a message, see MessageBuilder.create_message for the parameters.
+    """
+    block_vis = block_vis_str(block_vis)
+    location = location_str(location)
+    # STANDARD MESSAGES
+    if mt is MessageType.OPEN_DOOR:
+        msg = "Opening door of " + room_name
+    elif mt is MessageType.DROP_BLOCK:
+        msg = "Dropped goal block " + block_vis + " at drop location " + location
+    elif mt is MessageType.PICK_UP_BLOCK:
+        msg = "Picking up goal block " + block_vis + " at location " + location
+    elif mt is MessageType.MOVE_TO_ROOM:
+        msg = "Moving to " + room_name
+    elif mt is MessageType.SEARCHING_ROOM:
+        msg = "Searching through " + room_name
+    elif mt is MessageType.FOUND_GOAL_BLOCK:
+        msg = "Found goal block " + block_vis + " at location " + location
+
+    # NOT STANDARD MESSAGES
+    elif mt is MessageType.FOUND_BLOCK:
+        msg = "Found block " + block_vis + " at location " + location
+    elif mt is MessageType.GOAL_BLOCKS:
+        msg = "Goal blocks " + json.dumps(goal_blocks)
+
+    else:
+        raise ValueError(f"not implemented: {mt}")
+
+    return msg
+
+
+class _FrozenDict(tuple):
+    """ Immutable copy of a dict, as tuple of (key, value) """
+    __slots__ = ()
+
+
+class _FrozenList(tuple):
+    """ Immutable copy of a list """
+    __slots__ = ()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, _FrozenDict):
+        return {key: _thaw(item) for key, item in value}
+    if isinstance(value, _FrozenList):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _size_of(value):
+    """ Returns: approximate number of bytes used by value and the containers in it """
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(_size_of(item) for item in value)
+    return size
+
+
+class ParseCache:
+    """
+    Bounded cache of parsed message contents, that evicts the least recently used content.
+    Every broadcast message is parsed by all receivers and the same contents are sent over and over, so one cache
+    is shared by all agents in the process. Parsed contents are kept frozen, each lookup gets a fresh copy that the
+    receiver may change.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._parsed = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0  # approximate memory used by the cached contents and parse results
+
+    def get(self, content):
+        """ Returns: the parsed content as dict without 'from_id', or None if it is not cached """
+        parsed = self._parsed.get(content)
+        if parsed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._parsed.move_to_end(content)
+        return _thaw(parsed)
+
+    def put(self, content, parsed):
+        if content in self._parsed:
+            return
+        parsed = _freeze(parsed)
+        self._parsed[content] = parsed
+        self.bytes += sys.getsizeof(content) + _size_of(parsed)
+        if len(self._parsed) > self.maxsize:
+            old_content, old_parsed = self._parsed.popitem(last=False)
+            self.bytes -= sys.getsizeof(old_content) + _size_of(old_parsed)
+
+    def get_log_data(self):
+        return {'parse_cache_hits': self.hits, 'parse_cache_misses': self.misses,
+                'parse_cache_size': len(self._parsed), 'parse_cache_bytes': self.bytes}
+
+
+class RecentContents:
+    """
+    Set of the most recently added message contents, with a fixed size. Only the hashes of the contents are kept,
+    so it does not keep messages alive. The least recently added or found content is forgotten first.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._hashes = OrderedDict()
+
+    def __contains__(self, content):
+        content_hash = hash(content)
+        if content_hash not in self._hashes:
+            return False
+        self._hashes.move_to_end(content_hash)
+        return True
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, content):
+        content_hash = hash(content)
+        self._hashes[content_hash] = None
+        self._hashes.move_to_end(content_hash)
+        if len(self._hashes) > self.maxsize:
+            self._hashes.popitem(last=False)
+
+
 class MessageBuilder:
     """
     Class for sending and reading messages following the communication protocol mentioned in the assignment. To
@@ -90,12 +408,22 @@ class MessageBuilder:
     Implemented custom messages:
     * FOUND_BLOCK: "Found block [block_vis] at location [location]"
     """
-    def __init__(self, agent_name):
+    # parsed text contents, shared by all agents in the process
+    parse_cache = ParseCache()
+
+    def __init__(self, agent_name, structured=False):
+        """
+        @param agent_name: name of the sending agent
+        @param structured: if True, messages are sent as Packet instead of string. Use this only if all team
+            members read messages with process_message.
+        """
         self.agent_name = agent_name
+        self.structured = structured
 
     def create_message(self, mt, room_name=None, block_vis=None, location=None, goal_blocks = None):
         """
-        Method returns a matrx Message object with a string content built with the passed parameters
+        Method returns a matrx Message object with a string content built with the passed parameters,
+        or with a Packet content if the builder is structured.
 
         @param mt: MessageType
         @param room_name: str, thr room name (ie: room_3)
@@ -105,32 +433,12 @@ class MessageBuilder:
 
         @return: matrx Message.
         """
-        block_vis = block_vis_str(block_vis)
-        location = location_str(location)
-        # STANDARD MESSAGES
-        if mt is MessageType.OPEN_DOOR:
-            msg = "Opening door of " + room_name
-        elif mt is MessageType.DROP_BLOCK:
-            msg = "Dropped goal block " + block_vis + " at drop location " + location
-        elif mt is MessageType.PICK_UP_BLOCK:
-            msg = "Picking up goal block " + block_vis + " at location " + location
-        elif mt is MessageType.MOVE_TO_ROOM:
-            msg = "Moving to " + room_name
-        elif mt is MessageType.SEARCHING_ROOM:
-            msg = "Searching through " + room_name
-        elif mt is MessageType.FOUND_GOAL_BLOCK:
-            msg = "Found goal block " + block_vis + " at location " + location
-
-        # NOT STANDARD MESSAGES
-        elif mt is MessageType.FOUND_BLOCK:
-            msg = "Found block " + block_vis + " at location " + location
-        elif mt is MessageType.GOAL_BLOCKS:
-            msg = "Goal blocks " + json.dumps(goal_blocks)
-
+        if self.structured and mt is not MessageType.GOAL_BLOCKS:
+            content = Packet.of(mt, room_name, block_vis, location)
         else:
-            raise ValueError(f"not implemented: {mt}")
+            content = message_text(mt, room_name, block_vis, location, goal_blocks)
 
-        return Message(content=msg, from_id=self.agent_name)
+        return Message(content=content, from_id=self.agent_name)
 
     @staticmethod
     def process_message(msg):
@@ -147,37 +455,36 @@ class MessageBuilder:
         """
         res = {'from_id': msg.from_id}
 
-        content: str = msg.content
-
-        if content.startswith("Opening door of "):
-            res['type'] = MessageType.OPEN_DOOR
-            res['room_name'] = extract_room(content)
-        if content.startswith("Dropped goal block "):
-            res['type'] = MessageType.DROP_BLOCK
-            # extract block vis
-            res['visualization'] = extract_block_vis(content)
-            # extract location
-            res['location'] = extract_location(content)
-        if content.startswith("Picking up goal block "):
-            res['type'] = MessageType.PICK_UP_BLOCK
-            res['visualization'] = extract_block_vis(content)
-            res['location'] = extract_location(content)
-        if content.startswith("Moving to "):
-            res['type'] = MessageType.MOVE_TO_ROOM
-            res['room_name'] = extract_room(content)
-        if content.startswith("Searching through "):
-            res['type'] = MessageType.SEARCHING_ROOM
-            res['room_name'] = extract_room(content)
-        if content.startswith("Found goal block "):
-            res['type'] = MessageType.FOUND_GOAL_BLOCK
-            res['visualization'] = extract_block_vis(content)
-            res['location'] = extract_location(content)
-        if content.startswith("Found block "):
-            res['type'] = MessageType.FOUND_BLOCK
-            res['visualization'] = extract_block_vis(content)
-            res['location'] = extract_location(content)
-        if content.startswith("Goal blocks "):
-            res['type'] = MessageType.GOAL_BLOCKS
-            res['goal_blocks'] = extract_goal_blocks(content)
+        content = msg.content
+
+        if isinstance(content, Packet):
+            res['type'] = content.type
+            if content[1] is not None:
+                res['room_name'] = content.room_name
+            if content[2] is not None:
+                res['visualization'] = content.visualization
+            if content[3] is not None:
+                res['location'] = content.location
+            return res
+
+        parsed = MessageBuilder.parse_cache.get(content)
+        if parsed is None:
+            parsed = MessageBuilder.parse_content(content)
+            MessageBuilder.parse_cache.put(content, parsed)
+        res.update(parsed)
+        return res
+
+    @staticmethod
+    def parse_content(content):
+        """
+        Method parses the string content of a message
+        @param content: str following the protocol
+        @return dict: as process_message, without 'from_id'
+        """
+        mt = message_type(content)
+        if mt is None:
+            return {}
 
+        res = {'type': mt}
+        res.update(PARSERS[mt](content))
         return res
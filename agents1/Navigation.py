@@ -0,0 +1,275 @@
+from collections import OrderedDict
+
+from matrx.agents.agent_utils.navigator import get_move_actions
+from matrx.agents.agent_utils.state_tracker import StateTracker
+
+from agents1.Incremental import DStarLite
+from agents1.JumpPoint import JumpPointSearch
+from agents1.Layout import Layout
+from agents1.Perception import state_dict
+from agents1.RoomGraph import RoomGraph
+
+# Path planners of the PathNavigator
+GRID = 'grid'  # BFS distance fields over all tiles of the Layout
+ROOMS = 'rooms'  # hierarchical planning over the doors of the rooms, see RoomGraph
+JPS = 'jps'  # A* with jump points over the tiles, see JumpPointSearch
+DSTAR = 'dstar'  # incremental search per goal that is repaired when doors change, see DStarLite
+PLANNERS = (GRID, ROOMS, JPS, DSTAR)
+
+
+class PathNavigator:
+    """
+    Drop-in replacement for the matrx Navigator, for agents that move on the static BW4T layout.
+
+    The matrx Navigator runs A* on every get_move_action call. This navigator plans a path once per waypoint and
+    then follows it, so a step costs O(1). It only plans again when the agent leaves the path (eg a failed move)
+    or the next tile on the path is no longer traversable (a door was closed).
+    Paths come from the distance fields of the Layout, which are shared by all agents, or from the planner given.
+    With the DSTAR planner the searches of recent goals are kept and repaired, and a path is also repaired when a
+    door on or next to it opens or closes.
+    With a ReservationTable the path to each waypoint is planned around the other agents of the team, with waits, and
+    planned again when the agent is not where the path says it should be (eg its move failed).
+    """
+
+    def __init__(self, agent_id, action_set, planner=GRID, max_searches=16, reservations=None):
+        """
+        Args:
+            agent_id: id of the agent that moves
+            action_set: actions of the agent
+            planner: one of PLANNERS, how paths are planned
+            max_searches: nr of DStarLite searches kept for the most recent goals, for the DSTAR planner
+            reservations: ReservationTable of the team, None to plan without looking at the other agents
+        """
+        if planner not in PLANNERS:
+            raise ValueError("Unknown planner ", planner)
+        self.agent_id = agent_id
+        self.planner = planner
+        # (dx, dy) -> move action name
+        self._move_actions = {delta: action for action, delta in get_move_actions(action_set).items()
+                              if action is not None}
+        self._layout = None
+        # goal -> DStarLite towards that goal, least recently used first
+        self._searches = OrderedDict()
+        self._max_searches = max_searches
+        self.full_plans = 0  # paths planned from scratch
+        self.repairs = 0  # paths of a DStarLite search repaired after doors opened or closed
+        self._path_version = 0  # version of the layout when the current path was planned
+        self.reservations = reservations
+        # tick -> (location, next location) of the path to the current waypoint planned with the reservations
+        self._timed_steps = {}
+        self.is_waiting = False  # True if the last get_move_action waits for another agent
+        self._expected = None  # location where the last move action should bring the agent
+        self.failed_moves = 0
+        self.waits = 0  # ticks spent waiting for other agents
+        self.reset_full()
+
+    def reset_full(self):
+        """ Clears all waypoints """
+        self._waypoints = []
+        self._current_waypoint_idx = 0
+        # the planned path to the current waypoint in reverse order, so the next step is the last element
+        self._path = []
+        self._timed_steps = {}
+        self._request = None
+        self.is_done = True
+
+    def add_waypoint(self, waypoint):
+        self.add_waypoints([waypoint])
+
+    def add_waypoints(self, waypoints):
+        self._waypoints.extend(tuple(waypoint) for waypoint in waypoints)
+        self.is_done = self._current_waypoint_idx >= len(self._waypoints)
+
+    def add_request(self, request):
+        """ Adds the path of a PlanRequest as waypoints. The path is asked for at the next get_move_action, so that
+        the requests of all agents in a tick can be solved together.
+        """
+        self._request = request
+        self.is_done = False
+
+    def get_current_waypoint(self):
+        return self._waypoints[self._current_waypoint_idx]
+
+    def get_upcoming_waypoints(self):
+        return self._waypoints[self._current_waypoint_idx:]
+
+    def layout(self, state):
+        """ Returns: the Layout used by this navigator, with the doors updated to the state """
+        if self._layout is None:
+            self._layout = Layout.of(state)
+        else:
+            self._layout.update_doors(state)
+        return self._layout
+
+    @property
+    def plans_legs(self):
+        """ Returns: True if the navigator plans the whole path to each waypoint itself, so the waypoints need not
+        be the tiles of a path planned in advance.
+        """
+        return self.planner == DSTAR or self.reservations is not None
+
+    def plan(self, start, goal):
+        """ Plans a path on the layout.
+
+        Args:
+            start: location of the agent
+            goal: the waypoint to go to
+
+        Returns: list of locations from start (exclusive) to goal (inclusive), empty if the goal can't be reached
+        """
+        goal = tuple(goal)
+        # waypoints are often the tiles of a path, no need for a distance field to the next tile
+        if self._is_next_to(start, goal) and self._layout.is_traversable(goal):
+            return [goal]
+        if self.planner == DSTAR:
+            return self._search(goal).path(start)
+        self.full_plans += 1
+        if self.planner == ROOMS:
+            return RoomGraph.of(self._layout).path(start, goal)
+        if self.planner == JPS:
+            return JumpPointSearch.of(self._layout).path(start, goal)
+        return self._layout.path(start, goal)
+
+    def _search(self, goal):
+        """ Returns: the DStarLite search towards goal, counting whether it is new or is repaired for door changes """
+        search = self._searches.get(goal)
+        if search is None:
+            search = DStarLite(self._layout, goal)
+            self._searches[goal] = search
+            if len(self._searches) > self._max_searches:
+                self._searches.popitem(last=False)
+            self.full_plans += 1
+        else:
+            self._searches.move_to_end(goal)
+            if search.is_changed():
+                self.repairs += 1
+        return search
+
+    def _is_path_changed(self, agent_loc):
+        """ Returns: True if a door on or next to the rest of the path opened or closed since it was planned """
+        if self._layout.version == self._path_version:
+            return False
+        changes = self._layout.changes_since(self._path_version)
+        self._path_version = self._layout.version
+        return any(self._is_next_to(loc, tile) or loc == tile for loc in changes for tile in self._path + [agent_loc])
+
+    def get_move_action(self, state_tracker: StateTracker):
+        """ Returns the name of the move action towards the current waypoint, or None if all waypoints are visited
+        or the current waypoint can not be reached.
+        """
+        state = state_tracker.get_memorized_state()
+        self.layout(state)
+        if self._request is not None:
+            request, self._request = self._request, None
+            self.add_waypoints(request.path())
+
+        agent_loc = tuple(state[self.agent_id]['location'])
+        tick = state_dict(state)['World']['nr_ticks']
+        if self._expected is not None and self._expected != agent_loc:
+            self.failed_moves += 1
+        self._expected = None
+        self.is_waiting = False
+
+        # skip the waypoints we are at
+        while not self.is_done and self.get_current_waypoint() == agent_loc:
+            self._current_waypoint_idx += 1
+            self._path = []
+            self._timed_steps = {}
+            self.is_done = self._current_waypoint_idx >= len(self._waypoints)
+        if self.is_done:
+            return None
+
+        if self.reservations is not None:
+            return self._timed_move(agent_loc, tick)
+
+        # follow the path if we are still on it, otherwise plan a new one
+        if len(self._path) > 0 and self._path[-1] == agent_loc:
+            self._path.pop()
+        if len(self._path) == 0 or not self._is_next_to(agent_loc, self._path[-1]) \
+                or not self._layout.is_traversable(self._path[-1]) \
+                or (self.planner == DSTAR and self._is_path_changed(agent_loc)):
+            self._path_version = self._layout.version
+            self._path = self.plan(agent_loc, self.get_current_waypoint())[::-1]
+        if len(self._path) == 0:
+            return None
+
+        return self._move(agent_loc, self._path[-1])
+
+    def _timed_move(self, agent_loc, tick):
+        """ Returns: the move action of the timed path at tick, None to wait or if the waypoint can not be reached """
+        step = self._timed_steps.get(tick)
+        if not self.is_following(agent_loc, tick) or not self._layout.is_traversable(step[1]) \
+                or not self.reservations.can_move(self.agent_id, agent_loc, step[1], tick):
+            steps = self.reservations.plan(self.agent_id, self._layout, agent_loc, self.get_current_waypoint(), tick)
+            self.full_plans += 1
+            self.reservations.reserve(self.agent_id, steps)
+            self._timed_steps = {t: (loc, next_loc) for t, loc, next_loc in steps}
+            step = self._timed_steps.get(tick)
+        if step is None:
+            return None
+
+        if step[1] == agent_loc:
+            self.is_waiting = True
+            self.waits += 1
+            return None
+        return self._move(agent_loc, step[1])
+
+    def _move(self, agent_loc, step):
+        self._expected = step
+        return self._move_actions.get((step[0] - agent_loc[0], step[1] - agent_loc[1]))
+
+    def is_following(self, agent_loc, tick):
+        """ Returns: True if the timed path has an action for the agent at its location at tick """
+        step = self._timed_steps.get(tick)
+        return step is not None and step[0] == agent_loc
+
+    def stand(self, agent_loc, tick):
+        """ Reserves the tile of the agent for the next ticks, unless it is following a timed path.
+        Called every tick, so that other agents plan around agents that stand still.
+        """
+        if self.reservations is not None and not self.is_following(agent_loc, tick):
+            self.reservations.stand(self.agent_id, agent_loc, tick)
+
+    def get_log_data(self):
+        return {'planner_full_plans': self.full_plans, 'planner_repairs': self.repairs,
+                'navigator_failed_moves': self.failed_moves, 'navigator_waits': self.waits}
+
+    @staticmethod
+    def _is_next_to(loc, other):
+        return max(abs(loc[0] - other[0]), abs(loc[1] - other[1])) == 1
+
+
+class PathCache:
+    """
+    Bounded cache of planned paths, keyed by (layout, start, goal, open doors), that evicts the least recently used
+    path. The layout is part of the key, since worlds with other maps may run in the same process.
+    Agents plan the same routes over and over (door front to drop off, start row to the nearest closed door, ...),
+    so one cache is shared by all agents in the process.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layout, start, goal, open_doors):
+        """ Returns: the cached path on layout as tuple of locations, or None if it is not cached """
+        key = (layout, tuple(start), tuple(goal), open_doors)
+        path = self._paths.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._paths.move_to_end(key)
+        return path
+
+    def put(self, layout, start, goal, open_doors, path):
+        key = (layout, tuple(start), tuple(goal), open_doors)
+        self._paths[key] = tuple(path)
+        self._paths.move_to_end(key)
+        if len(self._paths) > self.maxsize:
+            self._paths.popitem(last=False)
+
+    def get_log_data(self):
+        return {'path_cache_hits': self.hits, 'path_cache_misses': self.misses, 'path_cache_size': len(self._paths)}
@@ -0,0 +1,52 @@
+from agents1.Records import Door, Block
+
+
+def state_dict(state):
+    """ Returns the plain dict of a matrx State. Looking up objects in it skips the property search of State. """
+    return state.as_dict() if hasattr(state, 'as_dict') else state
+
+
+def is_agent(obj):
+    """ Returns: True if obj is the body of an agent. Its class_inheritance holds the classes of the agent's brain. """
+    return obj.get('isAgent', False)
+
+
+def vis_key(vis):
+    """ Returns a hashable key of a block visualization dict: (shape, size, colour) """
+    return vis['shape'], vis['size'], vis['colour']
+
+
+class Perception:
+    """
+    Index of the objects an agent perceives in a tick, by type. Built once per tick with a single pass over the state,
+    so that finding doors or blocks does not scan all perceived objects again.
+    """
+
+    def __init__(self, state):
+        """
+        Args:
+            state: matrx state perceived by the agent (after filter_observations)
+        """
+        self.open_doors = []
+        self.closed_doors = []
+        self.blocks = []  # Block of each collectable block
+        self.blocks_by_vis = {}  # vis_key -> list of Block
+
+        for obj_id, obj in state_dict(state).items():
+            if obj_id == 'World' or 'class_inheritance' not in obj:
+                continue
+            inheritance = obj['class_inheritance']
+            if 'Door' in inheritance:
+                door = Door(obj['obj_id'], obj['location'], obj['room_name'], obj['is_open'])
+                if door.is_open:
+                    self.open_doors.append(door)
+                else:
+                    self.closed_doors.append(door)
+            elif 'CollectableBlock' in inheritance:
+                block = Block(obj['obj_id'], obj['location'], obj['visualization'])
+                self.blocks.append(block)
+                self.blocks_by_vis.setdefault(vis_key(block.visualization), []).append(block)
+
+    def doors(self, is_open):
+        """ Returns: list of the open doors if is_open, otherwise of the closed doors """
+        return self.open_doors if is_open else self.closed_doors
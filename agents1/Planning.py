@@ -0,0 +1,145 @@
+from collections import deque
+
+
+class PlanRequest:
+    """ Request of an agent for the path from start through coords, solved by its PlanningService. """
+
+    def __init__(self, service, start, coords):
+        self._service = service
+        self.start = tuple(start)
+        self.coords = [tuple(coord) for coord in coords]
+        self._path = None
+
+    def path(self):
+        """ Returns: list of locations on the path, solving all open requests of the service first if needed.
+        If a coordinate can't be reached, the coordinate itself is in the list, as in GenericAgent.path_through.
+        """
+        if self._path is None:
+            self._service.solve()
+        return self._path
+
+
+class _GoalSearch:
+    """
+    Breadth first search from a goal that stops as soon as the tiles asked for are reached, and is resumed from its
+    frontier when later requests ask for tiles further away.
+    """
+
+    def __init__(self, layout, goal):
+        self.field = {}  # location -> moves to the goal, final for all labelled tiles
+        self._queue = deque()
+        if layout.is_traversable(goal):
+            self.field[goal] = 0
+            self._queue.append(goal)
+
+    def reach(self, layout, starts):
+        """ Expands the search until all starts are labelled or the frontier is empty.
+        Returns: nr of tiles expanded
+        """
+        expansions = 0
+        missing = [start for start in starts if start not in self.field]
+        while self._queue and len(missing) > 0:
+            loc = self._queue.popleft()
+            expansions += 1
+            dist = self.field[loc] + 1
+            for n in layout.neighbours(loc):
+                if n not in self.field:
+                    self.field[n] = dist
+                    self._queue.append(n)
+            missing = [start for start in missing if start not in self.field]
+        return expansions
+
+
+class PlanningService:
+    """
+    Plans the paths of all agents on a Layout in batches.
+
+    An agent hands in a PlanRequest when it plans a path, and asks for the path when it starts to follow it, which is
+    its next action. By then the other agents that planned in the same tick have handed in theirs, so the whole batch
+    is solved together: the legs of all requests are grouped by goal, and each goal gets one multi-target search that
+    stops as soon as all the starts of the batch that go there are reached. The searches are kept until a door opens
+    or closes next to the tiles they reached, so later batches continue from their frontier instead of starting over.
+    Paths are the same as those of Layout.path.
+    """
+
+    # PlanningService of each Layout in this process
+    _services = {}
+
+    def __init__(self, layout):
+        self._layout = layout
+        self._pending = []  # requests that are not solved yet
+        self._searches = {}  # goal -> _GoalSearch
+        self._version = layout.version  # door changes of the layout that the searches are valid for
+        self.batches = 0
+        self.requests = 0
+        self.searches = 0  # nr of goal searches run or continued, over all batches
+        self.expansions = 0
+
+    @staticmethod
+    def of(layout):
+        """ Returns: the PlanningService of layout, shared with other agents on the same layout """
+        if layout not in PlanningService._services:
+            PlanningService._services[layout] = PlanningService(layout)
+        return PlanningService._services[layout]
+
+    def request(self, start, coords):
+        """ Returns: a PlanRequest for the path from start through coords, solved when its path is asked for """
+        request = PlanRequest(self, start, coords)
+        self._pending.append(request)
+        self.requests += 1
+        return request
+
+    def solve(self):
+        """ Solves all open requests in one batch """
+        self._drop_changed()
+        pending, self._pending = self._pending, []
+
+        # goal -> starts of the legs that go there
+        legs = {}
+        for request in pending:
+            start = request.start
+            for goal in request.coords:
+                legs.setdefault(goal, set()).add(start)
+                start = goal
+        for goal, starts in legs.items():
+            if goal not in self._searches:
+                self._searches[goal] = _GoalSearch(self._layout, goal)
+            self.expansions += self._searches[goal].reach(self._layout, starts)
+        self.searches += len(legs)
+        self.batches += 1
+
+        for request in pending:
+            path = []
+            start = request.start
+            for goal in request.coords:
+                leg = self._walk(start, self._searches[goal].field)
+                path.extend(leg if len(leg) > 0 else [goal])
+                start = goal
+            request._path = path
+
+    def _drop_changed(self):
+        """ Drops the searches that reached a door that opened or closed since the previous batch, or a tile next to
+        it, which includes the searches towards such a door. Searches that reached nothing, because their goal was
+        not traversable, are dropped too. The other searches did not see the door and are still valid.
+        """
+        changes = self._layout.changes_since(self._version)
+        self._version = self._layout.version
+        if len(changes) == 0:
+            return
+        around = {(x + dx, y + dy) for x, y in changes for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        self._searches = {goal: search for goal, search in self._searches.items()
+                          if len(search.field) > 0 and not any(loc in search.field for loc in around)}
+
+    def _walk(self, loc, field):
+        """ Returns: tiles from loc (exclusive) down the field to the goal, empty if loc is not in the field """
+        path = []
+        dist = field.get(loc)
+        while dist is not None and dist > 0:
+            loc = next(n for n in self._layout.neighbours(loc) if field.get(n) == dist - 1)
+            dist -= 1
+            path.append(loc)
+        return path
+
+    def get_log_data(self):
+        return {'planning_batches': self.batches, 'planning_requests': self.requests,
+                'planning_searches': self.searches, 'planning_expansions': self.expansions}
@@ -0,0 +1,76 @@
+class Record:
+    """
+    Small record with a fixed set of fields, stored in __slots__ instead of a dict.
+
+    Fields can also be read and written by name as in a dict (record['location']), so code written for the dict
+    shape keeps working. Use to_dict and from_dict to convert to and from that shape, eg for messages.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        for field, value in zip(self.__slots__, args):
+            setattr(self, field, value)
+        for field in self.__slots__[len(args):]:
+            setattr(self, field, kwargs.get(field))
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field):
+        return field in self.__slots__
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values):
+        """ Returns: record with the fields of cls taken from the dict values, missing fields are None """
+        return cls(*(values.get(field) for field in cls.__slots__))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, field) == getattr(other, field)
+                                                 for field in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return type(self).__name__ + repr(self.to_dict())
+
+
+class GoalBlock(Record):
+    """ A goal block of the world: how it looks, where it was found, and where it must be dropped. """
+    __slots__ = ('visualization', 'location', 'id', 'drop_off')
+
+
+class Door(Record):
+    """ A perceived door """
+    __slots__ = ('obj_id', 'location', 'room_name', 'is_open')
+
+
+class Block(Record):
+    """ A perceived collectable block """
+    __slots__ = ('obj_id', 'location', 'visualization')
+
+
+def goal_blocks_to_dicts(goal_blocks):
+    """ Returns: the goal blocks as dict of dicts, the shape of the GOAL_BLOCKS message """
+    return {key: goal_block.to_dict() for key, goal_block in goal_blocks.items()}
+
+
+def goal_blocks_from_dicts(goal_blocks):
+    """ Returns: the dict of dicts of a GOAL_BLOCKS message as dict of GoalBlock """
+    return {key: GoalBlock.from_dict(goal_block) for key, goal_block in goal_blocks.items()}
@@ -0,0 +1,185 @@
+import heapq
+
+from agents1.Layout import UNREACHABLE
+
+
+class ReservationTable:
+    """
+    Space-time reservations of a team of agents: which agent will be on which tile at which tick.
+
+    Agents plan with cooperative A* (plan): a search over (tile, tick) that avoids the tiles that other agents
+    reserved, and may wait on a tile. The planned path is then reserved, so agents that plan later go around it or
+    wait. An agent that moves at tick t is on its new tile from t on, and decides again at t + its move ticks, so a
+    move reserves the new tile for all these ticks. Agents with a slowdown take more ticks per move, see add_agent. Two agents can then never swap places or move onto the same tile.
+    Agents that do not move reserve the tile they stand on for the next few ticks.
+    There is one table per world, shared by the agents of the team, see ReservationTable.of.
+    """
+
+    # world id -> ReservationTable of the team in that world
+    _tables = {}
+
+    def __init__(self, hold=2, window=16, move_ticks=2):
+        """
+        Args:
+            hold: nr of ticks that an agent keeps the tile where it stands or where its path ends
+            window: nr of ticks that a plan may spend waiting, before falling back to a path that ignores others
+            move_ticks: nr of ticks from a move action to the next action of agents that were not added with
+                add_agent. matrx blocks an agent for the action_duration (the slowdown, 1 by default in BW4T) after
+                its action.
+        """
+        self.hold = hold
+        self.window = window
+        self.move_ticks = move_ticks
+        self._move_ticks = {}  # agent -> nr of ticks from a move action to its next action
+        self.tick = 0
+        self._cells = {}  # (location, tick) -> agent that reserved the tile for the tick
+        self._reserved = {}  # agent -> list of its (location, tick) reservations
+        self.expansions = 0  # nr of (tile, tick) states expanded by all plans
+
+    @staticmethod
+    def of(world_id, tick):
+        """ Returns the table of the team in the world, created on first use.
+
+        Args:
+            world_id: id of the matrx world
+            tick: current tick. A table that has seen later ticks is from an earlier run and is replaced.
+        """
+        table = ReservationTable._tables.get(world_id)
+        if table is None or table.tick > tick:
+            table = ReservationTable()
+            table.tick = tick
+            ReservationTable._tables[world_id] = table
+        return table
+
+    def add_agent(self, agent, move_ticks):
+        """ Sets the nr of ticks from a move action of agent to its next action, slowdown + 1 for BW4T agents """
+        self._move_ticks[agent] = move_ticks
+
+    def moves(self, agent):
+        """ Returns: nr of ticks from a move action of agent to its next action """
+        return self._move_ticks.get(agent, self.move_ticks)
+
+    def advance(self, tick):
+        """ Forgets the reservations of the ticks before tick """
+        if tick <= self.tick:
+            return
+        self.tick = tick
+        for agent, cells in self._reserved.items():
+            if len(cells) == 0 or cells[0][1] >= tick:
+                continue
+            for cell in cells:
+                if cell[1] < tick and self._cells.get(cell) == agent:
+                    del self._cells[cell]
+            self._reserved[agent] = [cell for cell in cells if cell[1] >= tick]
+
+    def is_free(self, agent, loc, tick):
+        """ Returns: True if no other agent reserved loc for tick """
+        return self._cells.get((loc, tick), agent) == agent
+
+    def release(self, agent):
+        """ Removes all reservations of agent """
+        for cell in self._reserved.pop(agent, []):
+            if self._cells.get(cell) == agent:
+                del self._cells[cell]
+
+    def _add(self, agent, cells, force=False):
+        """ Reserves cells for agent, in place of its old reservations. Cells of other agents are skipped unless force.
+        """
+        self.release(agent)
+        for cell in cells:
+            if force:
+                self._cells[cell] = agent
+            else:
+                self._cells.setdefault(cell, agent)
+        self._reserved[agent] = sorted(cells, key=lambda cell: cell[1])
+
+    def reserve(self, agent, steps):
+        """ Replaces the reservations of agent by a timed path.
+
+        Args:
+            agent: id of the agent
+            steps: list of (tick, location, next location) from plan
+        """
+        move_ticks = self.moves(agent)
+        cells = set()
+        for t, loc, next_loc in steps:
+            cells.add((loc, t))
+            if next_loc != loc:
+                cells.update((next_loc, t + dt) for dt in range(move_ticks))
+        if len(steps) > 0:
+            end = steps[-1][0] + (move_ticks if steps[-1][1] != steps[-1][2] else 1)
+            cells.update((steps[-1][2], end + dt) for dt in range(self.hold))
+        self._add(agent, cells)
+
+    def stand(self, agent, loc, tick):
+        """ Reserves loc for agent from tick for the next hold ticks, eg while it opens a door.
+        The agent is on loc, so this takes the tile from agents that planned to pass it.
+        """
+        self._add(agent, [(loc, tick + dt) for dt in range(self.hold + 1)], force=True)
+
+    def can_move(self, agent, loc, to, tick):
+        """ Returns: True if agent can move from loc to to at tick, or wait on loc if to is loc, without running into
+        another agent
+        """
+        if to == loc:
+            return self.is_free(agent, loc, tick + 1)
+        return all(self.is_free(agent, to, tick + dt) for dt in range(self.moves(agent) + 1))
+
+    def plan(self, agent, layout, start, goal, tick):
+        """ Cooperative A* from start to goal over (tile, tick), around the reservations of other agents.
+
+        Args:
+            agent: id of the agent that plans
+            layout: Layout of the world
+            start: location of the agent at tick
+            goal: location to go to
+            tick: current tick, at which the agent decides its next action
+
+        Returns: list of (tick, location, next location), one for each action of the agent from start to goal, where
+            next location is location for a wait. Empty if goal can not be reached. If goal can only be reached by
+            waiting longer than window, the shortest path that ignores the other agents.
+        """
+        start, goal = tuple(start), tuple(goal)
+        if start == goal:
+            return []
+        to_goal = layout.distance(start, goal)
+        if to_goal == UNREACHABLE:
+            return []
+        move_ticks = self.moves(agent)
+        last_tick = tick + to_goal * move_ticks + self.window
+
+        parent = {(start, tick): None}
+        heap = [(to_goal * move_ticks, 0, start, tick)]
+        while heap:
+            _, _, loc, t = heapq.heappop(heap)
+            if loc == goal:
+                return self._steps(parent, (loc, t))
+            self.expansions += 1
+            if t >= last_tick:
+                continue
+            for n in layout.neighbours(loc) + [loc]:
+                next_t = t + (1 if n == loc else move_ticks)
+                if (n, next_t) in parent or not self.can_move(agent, loc, n, t):
+                    continue
+                parent[(n, next_t)] = (loc, t)
+                # prefer the states further in time, they are closer to the goal for the same estimate
+                estimate = next_t - tick + layout.distance(n, goal) * move_ticks
+                heapq.heappush(heap, (estimate, -next_t, n, next_t))
+
+        # no way around the others, go the shortest way and wait where a move fails
+        steps = []
+        t = tick
+        for loc, next_loc in zip([start] + layout.path(start, goal), layout.path(start, goal)):
+            steps.append((t, loc, next_loc))
+            t += move_ticks
+        return steps
+
+    @staticmethod
+    def _steps(parent, state):
+        steps = []
+        while parent[state] is not None:
+            prev = parent[state]
+            steps.append((prev[1], prev[0], state[0]))
+            state = prev
+        steps.reverse()
+        return steps
@@ -0,0 +1,270 @@
+import heapq
+from collections import Counter, deque
+
+from agents1.Layout import MOVES, UNREACHABLE
+
+# Regions with more tiles than SEGMENT * SEGMENT are cut into segments of at most SEGMENT by SEGMENT tiles
+SEGMENT = 12
+
+
+class RoomGraph:
+    """
+    Hierarchical path planner on a Layout.
+
+    The tiles of the layout are split by the doors into regions: the inside of each room and the hallway. Regions
+    larger than a room, such as the hallway, are cut into segments by gates: their tiles on every SEGMENT-th row
+    and column. Every path between two segments crosses a gate, so gates are handled as doors that are always open.
+    The abstract graph has a node for each door and gate, and an edge between two nodes of the same region with the
+    number of moves between them through that region, or of one move if they are next to each other. A path is
+    planned over the nodes with A*, and is then filled in with tiles from BFS fields that stay inside one
+    region, so no search covers more than one room or segment. Fields and node to node distances are computed on
+    first use and shared by all agents on the layout. Closed doors are left out of the graph when planning, so the
+    graph does not change when doors open or close.
+    """
+
+    # RoomGraph of each Layout in this process
+    _graphs = {}
+
+    def __init__(self, layout):
+        self._layout = layout
+        self._doors = set(layout.door_locations())
+        self._gates = set()
+        self._region = {}  # location -> region nr, for all tiles that are not a wall, door or gate
+        self._find_regions()
+        sizes = Counter(self._region.values())
+        self._gates = {loc for loc, region in self._region.items() if sizes[region] > SEGMENT * SEGMENT
+                       and (loc[0] % SEGMENT == 0 or loc[1] % SEGMENT == 0)}
+        if self._gates:
+            self._region = {}
+            self._find_regions()
+        # the gates are handled as doors from here on
+        self._doors |= self._gates
+
+        # door -> {region: tiles of the region next to the door}
+        self._portals = {}
+        # door -> doors one move away from the door
+        self._links = {}
+        # region -> doors of the region
+        self._region_doors = {}
+        for door in self._doors:
+            portals = {}
+            for n in self._around(door):
+                if n in self._region:
+                    portals.setdefault(self._region[n], []).append(n)
+            self._portals[door] = portals
+            self._links[door] = [n for n in self._around(door) if n in self._doors]
+            for region in portals:
+                self._region_doors.setdefault(region, []).append(door)
+
+        # (door, region) -> field with the moves from the door to each tile of the region
+        self._door_fields = {}
+        # location -> field with the moves from each tile in the region of location to location
+        self._fields = {}
+        # door -> list of (moves, other door, region between them or None, dead end), see _edges_of
+        self._edges = {}
+        self.expansions = 0  # nr of tiles and doors expanded by all searches, for comparing planners
+
+    @staticmethod
+    def of(layout):
+        """ Returns: the RoomGraph of layout, shared with other agents on the same layout """
+        if layout not in RoomGraph._graphs:
+            RoomGraph._graphs[layout] = RoomGraph(layout)
+        return RoomGraph._graphs[layout]
+
+    def _around(self, loc):
+        x, y = loc
+        return [(x + dx, y + dy) for dx, dy in MOVES if self._layout.in_grid((x + dx, y + dy))]
+
+    def _find_regions(self):
+        """ Labels the connected tiles between walls, doors and gates with a region nr """
+        region = 0
+        for y in range(self._layout.height):
+            for x in range(self._layout.width):
+                loc = (x, y)
+                if loc in self._region or self._is_border(loc):
+                    continue
+                self._region[loc] = region
+                queue = deque([loc])
+                while queue:
+                    for n in self._around(queue.popleft()):
+                        if n not in self._region and not self._is_border(n):
+                            self._region[n] = region
+                            queue.append(n)
+                region += 1
+
+    def _is_border(self, loc):
+        return loc in self._doors or loc in self._gates or self._layout.is_wall(loc)
+
+    def _bfs(self, field, queue):
+        """ Breadth first propagation of the distances in field, staying inside the region of the queued tiles """
+        while queue:
+            loc = queue.popleft()
+            self.expansions += 1
+            dist = field[loc] + 1
+            region = self._region[loc]
+            for n in self._around(loc):
+                if n not in field and self._region.get(n) == region:
+                    field[n] = dist
+                    queue.append(n)
+        return field
+
+    def _field(self, target):
+        """ Returns: dict with the moves from each tile in the region of target to target """
+        if target not in self._fields:
+            self._fields[target] = self._bfs({target: 0}, deque([target]))
+        return self._fields[target]
+
+    def _door_field(self, door, region):
+        """ Returns: dict with the moves from door to each tile of region, through that region """
+        key = (door, region)
+        if key not in self._door_fields:
+            portals = self._portals[door][region]
+            self._door_fields[key] = self._bfs({portal: 1 for portal in portals}, deque(portals))
+        return self._door_fields[key]
+
+    def _door_distance(self, door, other, region):
+        """ Returns: moves from door to other through region """
+        field = self._door_field(door, region)
+        return min([field[portal] for portal in self._portals[other][region] if portal in field],
+                   default=UNREACHABLE) + 1
+
+    def _dead_end(self, door, region):
+        """ Returns: the regions behind door, coming from region, if none of them has other doors, else None """
+        if self._links[door]:
+            return None
+        behind = [other for other in self._portals[door] if other != region]
+        if any(len(self._region_doors[other]) > 1 for other in behind):
+            return None
+        return behind
+
+    def _leads_on(self, door, region, goal, goal_region):
+        """ Returns: False if going through door from region can only end in a room with no other doors """
+        dead_end = self._dead_end(door, region)
+        return dead_end is None or door == goal or goal_region in dead_end
+
+    def _edges_of(self, door):
+        """ Returns: list of (moves, other door, region between them or None, dead end) for the doors that can be
+        reached from door without passing another door, with None as region for the doors next to door, and the
+        dead end of other as given by _dead_end """
+        if door not in self._edges:
+            edges = []
+            for region in self._portals[door]:
+                for other in self._region_doors[region]:
+                    if other != door:
+                        edges.append((self._door_distance(door, other, region), other, region,
+                                      self._dead_end(other, region)))
+            edges += [(1, other, None, None) for other in self._links[door]]
+            self._edges[door] = edges
+        return self._edges[door]
+
+    def _is_open(self, door):
+        return self._layout.is_traversable(door)
+
+    @staticmethod
+    def _estimate(loc, goal):
+        """ Returns: lower bound of the moves from loc to goal: the larger of the x and y distance, as moves can be
+        diagonal """
+        return max(abs(loc[0] - goal[0]), abs(loc[1] - goal[1]))
+
+    def path(self, start, goal):
+        """ Returns: list of locations from start (exclusive) to goal (inclusive), empty if there is no path """
+        start, goal = tuple(start), tuple(goal)
+        if start == goal or not self._layout.in_grid(goal):
+            return []
+        if goal in self._doors:
+            if not self._is_open(goal):
+                return []
+        elif goal not in self._region:
+            return []
+        start_region = self._region.get(start)
+        goal_region = self._region.get(goal)
+        closed = {door for door in self._layout.door_locations() if not self._layout.is_traversable(door)}
+
+        # best way to the goal found so far: (moves, last door or None for a path within the start region)
+        best = (UNREACHABLE, None)
+        if start_region is not None and start_region == goal_region:
+            best = (self._field(goal).get(start, UNREACHABLE), None)
+
+        # A* over the open doors. prev: door -> (previous door or None for start, region between them or None
+        # for doors next to each other)
+        dist = {}
+        prev = {}
+        heap = []
+        if start in self._doors:
+            dist[start] = 0
+            prev[start] = (None, None)
+            heap.append((self._estimate(start, goal), 0, start))
+        elif start_region is not None:
+            for door in self._region_doors.get(start_region, []):
+                if not self._is_open(door) or not self._leads_on(door, start_region, goal, goal_region):
+                    continue
+                moves = self._door_field(door, start_region).get(start, UNREACHABLE)
+                if moves < dist.get(door, UNREACHABLE):
+                    dist[door] = moves
+                    prev[door] = (None, start_region)
+                    heapq.heappush(heap, (moves + self._estimate(door, goal), moves, door))
+
+        while heap:
+            estimate, moves, door = heapq.heappop(heap)
+            if estimate >= best[0]:
+                break
+            if moves > dist[door]:
+                continue
+            self.expansions += 1
+            if door == goal:
+                best = (moves, door)
+                continue
+            if goal_region is not None and goal_region in self._portals[door]:
+                to_goal = moves + self._door_field(door, goal_region).get(goal, UNREACHABLE)
+                if to_goal < best[0]:
+                    best = (to_goal, door)
+            for edge_moves, other, region, dead_end in self._edges_of(door):
+                if other in closed or dead_end is not None and other != goal and goal_region not in dead_end:
+                    continue
+                other_moves = moves + edge_moves
+                if other_moves < dist.get(other, UNREACHABLE):
+                    dist[other] = other_moves
+                    prev[other] = (door, region)
+                    heapq.heappush(heap, (other_moves + self._estimate(other, goal), other_moves, other))
+
+        if best[0] == UNREACHABLE:
+            return []
+        return self._tiles(start, goal, best[1], prev)
+
+    def _tiles(self, start, goal, last_door, prev):
+        """ Fills in the tiles of the path start, doors..., goal found by path """
+        if last_door is None:
+            return self._walk(start, self._field(goal), 0)
+
+        doors = [last_door]
+        while prev[doors[-1]][0] is not None:
+            doors.append(prev[doors[-1]][0])
+        doors.reverse()
+
+        # from start to the first door
+        path = []
+        if start != doors[0]:
+            path = self._walk(start, self._door_field(doors[0], prev[doors[0]][1]), 1) + [doors[0]]
+        # from door to door
+        for door, other in zip(doors, doors[1:]):
+            region = prev[other][1]
+            if region is not None:
+                path += self._leave(door, region, self._door_field(other, region), 1)
+            path.append(other)
+        # from the last door to the goal
+        if goal != last_door:
+            path += self._leave(last_door, self._region[goal], self._field(goal), 0)
+        return path
+
+    def _leave(self, door, region, field, stop):
+        """ Returns: tiles from door into region and then down the field to stop """
+        portal = min([portal for portal in self._portals[door][region] if portal in field], key=field.get)
+        return [portal] + self._walk(portal, field, stop)
+
+    def _walk(self, loc, field, stop):
+        """ Returns: tiles from loc (exclusive) down the field to the tile with value stop """
+        path = []
+        for dist in range(field[loc] - 1, stop - 1, -1):
+            loc = next(n for n in self._around(loc) if field.get(n) == dist)
+            path.append(loc)
+        return path
@@ -85,27 +85,22 @@ class StrongAgent(GenericAgent):
         return res, msg
 
     def check_surroundings_for_box(self, state):
-        blocks = [(block['visualization'], block['location'], block['obj_id']) for block in state.values() if
-                  'class_inheritance' in block and 'CollectableBlock' in block['class_inheritance']]
+        blocks = [(block['visualization'], block['location'], block['obj_id'])
+                  for block in self.perceive(state).blocks]
 
         # check if any of the found blocks are our goal block
         for block, location, obj_id in blocks:
-            for key, goal_block in self._goal_blocks.items():
+            for key in self.matching_goal_blocks(block):
+                if key == self._searching_for:
+                    self._grab_block = self._searching_for
 
-                if block['colour'] == goal_block['visualization']['colour'] \
-                        and block['shape'] == goal_block['visualization']['shape'] \
-                        and block['size'] == goal_block['visualization']['size']:
+                self._goal_blocks[key]['location'] = location
+                self._goal_blocks[key]['id'] = obj_id
 
-                    if key == self._searching_for:
-                        self._grab_block = self._searching_for
-
-                    self._goal_blocks[key]['location'] = location
-                    self._goal_blocks[key]['id'] = obj_id
-
-                    msg = self._mb.create_message(MessageType.FOUND_GOAL_BLOCK,
-                                                  block_vis=self._goal_blocks[key]["visualization"],
-                                                  location=location)
-                    self._sendMessage(msg)
+                msg = self._mb.create_message(MessageType.FOUND_GOAL_BLOCK,
+                                              block_vis=self._goal_blocks[key]["visualization"],
+                                              location=location)
+                self._sendMessage(msg)
 
     def grab_block(self, obj_id, phase):
         """ Grabs block
@@ -0,0 +1,197 @@
+import numpy as np
+
+
+def same_block(vis, other):
+    """ Returns: True if the block visualizations match. Unknown colours (colourblind agents) match any colour. """
+    if vis['shape'] != other['shape'] or vis['size'] != other['size']:
+        return False
+    colours = (vis['colour'], other['colour'])
+    return None in colours or 'None' in colours or colours[0] == colours[1]
+
+
+class TrustModel:
+    """
+    Trust beliefs of an agent in its team members, kept over the whole run.
+
+    Each belief starts at the default score and is updated when a message or an own observation confirms or
+    contradicts what a member said. Updating and querying a belief costs O(1).
+    """
+
+    def __init__(self, default=0.5, reward=0.1, penalty=0.1):
+        """
+        Args:
+            default: score of a member that nothing is known of
+            reward: score added when a claim of a member is confirmed
+            penalty: score subtracted when a claim of a member is contradicted
+        """
+        self.default = default
+        self.reward = reward
+        self.penalty = penalty
+        self._scores = {}  # member -> trust score in [0, 1]
+        self._confirmed = {}  # member -> nr of confirmed claims
+        self._contradicted = {}  # member -> nr of contradicted claims
+
+    def add_member(self, member):
+        if member not in self._scores:
+            self._scores[member] = self.default
+            self._confirmed[member] = 0
+            self._contradicted[member] = 0
+
+    def trust(self, member):
+        """ Returns: the trust score of member """
+        return self._scores.get(member, self.default)
+
+    @property
+    def beliefs(self):
+        """ Returns: dict with the trust score of each member. Do not change it. """
+        return self._scores
+
+    def update(self, member, delta):
+        """ Adds delta to the score of member, keeping it in [0, 1] """
+        self.add_member(member)
+        self._scores[member] = min(1.0, max(0.0, self._scores[member] + delta))
+
+    def confirm(self, member):
+        self.update(member, self.reward)
+        self._confirmed[member] += 1
+
+    def contradict(self, member):
+        self.update(member, -self.penalty)
+        self._contradicted[member] += 1
+
+    def get_log_data(self):
+        data = {}
+        for member, score in self._scores.items():
+            data['trust_' + member] = score
+            data['confirmed_' + member] = self._confirmed[member]
+            data['contradicted_' + member] = self._contradicted[member]
+        return data
+
+
+class TrustMatrix:
+    """
+    Trust scores of a whole team in one NumPy matrix: row observer, column member.
+
+    Evidence is collected during a tick and applied in one vectorized update when the next tick starts, so all
+    observers read the same scores within a tick. There is one matrix per world, shared by the agents of the team,
+    which pass a snapshot of it to the logger in their log data.
+    """
+
+    # world id -> TrustMatrix of the team in that world
+    _matrices = {}
+
+    def __init__(self, members, default=0.5):
+        """
+        Args:
+            members: ids of all agents in the team
+            default: score that all beliefs start with
+        """
+        self.members = list(members)
+        self._index = {member: idx for idx, member in enumerate(self.members)}
+        n = len(self.members)
+        self.scores = np.full((n, n), default)
+        self.confirmed = np.zeros((n, n), dtype=np.int64)
+        self.contradicted = np.zeros((n, n), dtype=np.int64)
+        self.tick = 0
+        self.version = 0  # nr of updates applied to the scores
+        # evidence of the current tick: observer index, member index and score change
+        self._observers = []
+        self._subjects = []
+        self._deltas = []
+
+    @staticmethod
+    def of(world_id, members, tick):
+        """ Returns the matrix of the team in the world, created on first use.
+
+        Args:
+            world_id: id of the matrx world
+            members: ids of all agents in the team
+            tick: current tick. A matrix that has seen later ticks is from an earlier run and is replaced.
+        """
+        matrix = TrustMatrix._matrices.get(world_id)
+        if matrix is None or matrix.tick > tick or matrix.members != list(members):
+            matrix = TrustMatrix(members)
+            matrix.tick = tick
+            TrustMatrix._matrices[world_id] = matrix
+        return matrix
+
+    def index(self, member):
+        """ Returns: row/column of member, or None if it is not in the team """
+        return self._index.get(member)
+
+    def add(self, observer, member, delta):
+        """ Adds evidence of observer about member, applied at the next tick """
+        self._observers.append(self._index[observer])
+        self._subjects.append(self._index[member])
+        self._deltas.append(delta)
+
+    def advance(self, tick):
+        """ Applies the evidence of the previous ticks if tick is a new tick """
+        if tick <= self.tick:
+            return
+        self.tick = tick
+        if len(self._deltas) == 0:
+            return
+        cells = (np.array(self._observers), np.array(self._subjects))
+        deltas = np.array(self._deltas)
+        np.add.at(self.scores, cells, deltas)
+        np.clip(self.scores, 0.0, 1.0, out=self.scores)
+        np.add.at(self.confirmed, cells, deltas > 0)
+        np.add.at(self.contradicted, cells, deltas < 0)
+        self._observers = []
+        self._subjects = []
+        self._deltas = []
+        self.version += 1
+
+    def snapshot(self):
+        """ Returns: dict with the members, the tick and version of the scores, and the scores and confirm/contradict
+        counts themselves. The arrays are not copied, the logger copies them when the version changed.
+        """
+        return {'members': self.members, 'tick': self.tick, 'version': self.version, 'scores': self.scores,
+                'confirmed': self.confirmed, 'contradicted': self.contradicted}
+
+
+class MatrixTrustModel(TrustModel):
+    """
+    TrustModel of one observer, backed by a row of the team TrustMatrix.
+    Updates take effect at the next tick, see TrustMatrix.
+    """
+
+    def __init__(self, matrix, observer, default=0.5, reward=0.1, penalty=0.1):
+        super().__init__(default, reward, penalty)
+        self._matrix = matrix
+        self._observer = observer
+        self._row = matrix.index(observer)
+
+    def add_member(self, member):
+        pass
+
+    def trust(self, member):
+        idx = self._matrix.index(member)
+        return self.default if idx is None else self._matrix.scores[self._row, idx]
+
+    @property
+    def beliefs(self):
+        return {member: self._matrix.scores[self._row, idx] for idx, member in enumerate(self._matrix.members)
+                if member != self._observer}
+
+    def update(self, member, delta):
+        if self._matrix.index(member) is not None:
+            self._matrix.add(self._observer, member, delta)
+
+    def confirm(self, member):
+        self.update(member, self.reward)
+
+    def contradict(self, member):
+        self.update(member, -self.penalty)
+
+    def get_log_data(self):
+        data = {}
+        for idx, member in enumerate(self._matrix.members):
+            if member == self._observer:
+                continue
+            data['trust_' + member] = float(self._matrix.scores[self._row, idx])
+            data['confirmed_' + member] = int(self._matrix.confirmed[self._row, idx])
+            data['contradicted_' + member] = int(self._matrix.contradicted[self._row, idx])
+        data['trust_matrix'] = self._matrix.snapshot()
+        return data
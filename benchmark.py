@@ -1,12 +1,13 @@
 import random
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import copy
 import numpy as np
 import json
 from bw4t.BW4TWorld import BW4TWorld
 from bw4t.statistics import Statistics
-from agents1.BW4TBaselineAgent import BaseLineAgent
 from agents1.BW4THuman import Human
-from agents1.LiarAgent import LiarAgent
 from typing import Final, List
 from matrx.actions.move_actions import MoveEast, MoveSouth, MoveWest
 from matrx.actions import MoveNorth, OpenDoorAction, CloseDoorAction
@@ -23,7 +24,7 @@ from bw4t.BW4THumanBrain import HumanBrain
 
 BENCHMARK_WORLDSETTINGS: dict = {
     'deadline': 3000,  # Ticks after which world terminates anyway
-    'tick_duration': 0.1,  # Set to 0 for fastest possible runs.
+    'tick_duration': 0,  # Benchmarks are headless, so run as fast as possible.
     'random_seed': 1,
     'verbose': False,
     'matrx_paused': False,
@@ -58,7 +59,8 @@ BENCHMARK_WORLDSETTINGS: dict = {
     'block_sense_range': 1,  # the range with which agents detect blocks
     'other_sense_range': np.inf,  # the range with which agents detect other objects (walls, doors, etc.)
     'agent_memory_decay': 5,  # we want to memorize states for seconds / tick_duration ticks
-    'fov_occlusion': True  # true if walls block vision. Not sure if this works at all.
+    'fov_occlusion': True,  # true if walls block vision. Not sure if this works at all.
+    'agents_traversable': True,  # False if agents can not move onto the tile of another agent
 
 }
 
@@ -89,24 +91,80 @@ def make_agent_combinations(agent_pool, agent_number, number_of_combinations):
 
     return agent_combinations, setup
 
+def load_botclass(path:str):
+    '''
+    @param path import path of a bot class, eg "agents1.LiarAgent.LiarAgent"
+    @return the bot class
+    '''
+    module, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+def run_game(agent_combination, logfile_prefix="", seed=None):
+    '''
+    Runs a single world with BENCHMARK_WORLDSETTINGS.
+    This is the process pool worker, so arguments and result must be picklable.
+    @param agent_combination list of agents as given to BW4TWorld,
+        but with 'botclass' the import path of the bot class
+    @param logfile_prefix prefix of the log file of this run
+    @param seed seed for the random module, None to leave it as is
+    @return the Statistics summary of the run
+    '''
+    if seed is not None:
+        random.seed(seed)
+    agents = [dict(agent, botclass=load_botclass(agent['botclass'])) for agent in agent_combination]
+    world = BW4TWorld(agents, worldsettings=BENCHMARK_WORLDSETTINGS, logfile_prefix=logfile_prefix).run()
+    results = Statistics(world.getLogger().getFileName(), streaming=True)
+    print(results, flush=True)
+    return results.getSummary()
+
+def run_benchmark(agent_combinations, number_of_runs, number_of_workers=1):
+    '''
+    Runs every combination number_of_runs times.
+    @param number_of_workers number of worker processes. With 1 all runs are done in this process.
+    @return list with for each combination the list of run summaries (see Statistics.getSummary), in run order
+    '''
+    jobs = [(idx, i) for idx in range(len(agent_combinations)) for i in range(number_of_runs)]
+    # each run gets its own seed, otherwise forked workers all continue from the same random state
+    seeds = {job: random.randrange(2**32) for job in jobs}
+    results = [[None] * number_of_runs for _ in agent_combinations]
+
+    if number_of_workers <= 1:
+        for idx, i in jobs:
+            print(f"COMBINATION: {idx} RUN: {i}", flush=True)
+            results[idx][i] = run_game(agent_combinations[idx], f"c{idx}_r{i}", seeds[(idx, i)])
+        return results
+
+    # the logger creates its folder if it does not exist, which races between workers
+    os.makedirs("world_1", exist_ok=True)
+    with ProcessPoolExecutor(max_workers=number_of_workers) as pool:
+        futures = {pool.submit(run_game, agent_combinations[idx], f"c{idx}_r{i}", seeds[(idx, i)]): (idx, i)
+                   for idx, i in jobs}
+        for future in as_completed(futures):
+            idx, i = futures[future]
+            print(f"COMBINATION: {idx} RUN: {i} done", flush=True)
+            results[idx][i] = future.result()
+    return results
+
 if __name__ == "__main__":
     #amount of agents in one run
     agent_number = 4
     number_of_combinations = 2 #number of random agent combinations
     number_of_runs = 2 # runs for each combination
     filename = 'data.json' # result file
+    number_of_workers = os.cpu_count() # worker processes, 1 runs everything in this process
 
     total_runs = number_of_combinations * number_of_runs
 
     agent_pool = {
         "liar": { # name here has to match name in agent_pool[agent_name][agent]
-            "agent": {'name':'liar', 'botclass':LiarAgent, 'settings':{}},
+            # botclass is the import path of the class, so the combinations can be sent to the workers
+            "agent": {'name':'liar', 'botclass':'agents1.LiarAgent.LiarAgent', 'settings':{}},
             "join_prob": 0.5, # probability that this agent ends up in the lineup
             "max": 10, #max number of this agent type
             "added": 0 # Do not change this one
         },
         "baseline": {
-            "agent": {'name':'baseline', 'botclass':BaseLineAgent, 'settings':{}},
+            "agent": {'name':'baseline', 'botclass':'agents1.BW4TBaselineAgent.BaseLineAgent', 'settings':{}},
             "join_prob": 0.7,
             "max": 10,
             "added": 0
@@ -134,6 +192,7 @@ if __name__ == "__main__":
 
 
     print("Started benchmark...")
+    all_results = run_benchmark(agent_combinations, number_of_runs, number_of_workers)
     for idx, agent_combination in enumerate(agent_combinations):
         success_rate = 0
         total_agent_messages = None
@@ -141,24 +200,19 @@ if __name__ == "__main__":
         total_agent_moves = None
         total_ticks = 0
 
-        for i in range(0, number_of_runs):
-            print(f"COMBINATION: {idx} RUN: {i}", flush=True)
-            world=BW4TWorld(agent_combination,worldsettings=BENCHMARK_WORLDSETTINGS).run()
-            results = Statistics(world.getLogger().getFileName())
-            print(results)
-
-            total_ticks += int(results.getLastTick())
+        for results in all_results[idx]:
+            total_ticks += int(results['last_tick'])
 
-            if results.isSucces():
+            if results['success']:
                 success_rate += 1
 
             if total_agent_messages is None:
-                total_agent_drops = results._drops
-                total_agent_messages = {key : int(results._messages[key]) for key in results._messages}
-                total_agent_moves = results._moves
+                total_agent_drops = results['drops']
+                total_agent_messages = {key : int(results['messages'][key]) for key in results['messages']}
+                total_agent_moves = results['moves']
             else:
                 for (messages_key, messages_value), (drops_key, drops_value), (moves_key, moves_value)\
-                        in zip(results._messages.items(), results._drops.items(), results._moves.items()):
+                        in zip(results['messages'].items(), results['drops'].items(), results['moves'].items()):
                     total_agent_messages[messages_key] += int(messages_value)
                     total_agent_drops[drops_key] += drops_value
                     total_agent_moves[moves_key] += moves_value
@@ -176,7 +230,7 @@ if __name__ == "__main__":
 
 
         games[f"game_{idx}"] = {
-            "setup": results.getAgents(),
+            "setup": results['agents'],
             "success_rate": success_rate / number_of_runs,
             "avg_moves": sum(total_agent_moves.values()) / number_of_runs,
             "avg_ticks": total_ticks / number_of_runs,
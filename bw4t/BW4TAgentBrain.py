@@ -1,5 +1,6 @@
 import copy
 import warnings
+from collections import deque
 import numpy as np
 from matrx.agents.agent_brain import AgentBrain
 from matrx.actions import GrabObject, RemoveObject, OpenDoorAction, CloseDoorAction
@@ -7,13 +8,85 @@ from matrx.agents.agent_utils.state import State
 from matrx.messages import Message
 
 
+# Overflow policies of the inbox of an agent
+DROP_OLDEST = 'drop_oldest'  # a full inbox drops its oldest message for a new one
+COALESCE = 'coalesce'  # a message that is already in the inbox (same sender and content) is not added again
+
+
+class Inbox(deque):
+    """
+    Bounded queue of received messages. Read it from the front with popleft(), which is O(1).
+    When the inbox is full the oldest message is dropped. With the COALESCE policy, messages with the same
+    sender and content as one that is still in the inbox are not added either.
+    """
+
+    def __init__(self, maxlen=None, policy=DROP_OLDEST):
+        """
+        @param maxlen max nr of messages in the inbox, None for no bound
+        @param policy DROP_OLDEST or COALESCE
+        """
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError("Unknown inbox policy ", policy)
+        super().__init__(maxlen=maxlen)
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        # (sender, content) of the messages in the inbox, only kept for COALESCE
+        self._keys = set()
+
+    @staticmethod
+    def _key(mssg):
+        key = (mssg.from_id, mssg.content)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def append(self, mssg):
+        key = None
+        if self.policy == COALESCE:
+            key = Inbox._key(mssg)
+            if key is not None and key in self._keys:
+                self.coalesced += 1
+                return
+        if self.maxlen is not None and len(self) == self.maxlen:
+            self.popleft()
+            self.dropped += 1
+        super().append(mssg)
+        if key is not None:
+            self._keys.add(key)
+
+    def popleft(self):
+        mssg = super().popleft()
+        self._forget(mssg)
+        return mssg
+
+    def pop(self):
+        mssg = super().pop()
+        self._forget(mssg)
+        return mssg
+
+    def remove(self, mssg):
+        super().remove(mssg)
+        self._forget(mssg)
+
+    def clear(self):
+        super().clear()
+        self._keys.clear()
+
+    def _forget(self, mssg):
+        if self._keys:
+            self._keys.discard(Inbox._key(mssg))
+
+
 class BW4TAgentBrain(AgentBrain):
     """ An artificial agent whose behaviour can be programmed to be, for example, (semi-)autonomous.
     This brain inherits from the normal MATRX AgentBrain but with one small adjustment in the function '_set_messages' making it possible to identify the sender of messages.
     """
 
 
-    def __init__(self,memorize_for_ticks=None):
+    def __init__(self,memorize_for_ticks=None, inbox_size=None, inbox_policy=DROP_OLDEST):
         """ Defines the behavior of an agent.
         This class is the place where all the decision logic of an agent is
         contained. This class together with the
@@ -59,8 +132,9 @@ class BW4TAgentBrain(AgentBrain):
         previous_action_result: ActionResult
             The :class:`matrx.actions.action.ActionResult` of the previously
             performed or attempted action.
-        received_messages: [Message, ...]
-            The list of received messages.
+        received_messages: Inbox
+            The received messages, oldest first. Bounded by inbox_size, see
+            Inbox for the overflow policies.
         rnd_gen: Random
             The random generator for this agent.
         rnd_seed: int
@@ -75,7 +149,12 @@ class BW4TAgentBrain(AgentBrain):
         # A list of messages that may be filled by this agent, which is retrieved by the GridWorld and send towards the
         # appropriate agents.
         self.messages_to_send = []
-        self.received_messages = []
+        self.__inbox_size = inbox_size
+        self.__inbox_policy = inbox_policy
+        self.received_messages = Inbox(inbox_size, inbox_policy)
+        # nr of received messages in the inbox after the last delivery, and the max of that
+        self._inbox_last = 0
+        self._inbox_max = 0
 
         # Filled by the WorldFactory during self.factory_initialise()
         self.agent_id = None
@@ -111,7 +190,9 @@ class BW4TAgentBrain(AgentBrain):
         self.previous_action = None
         self.previous_action_result = None
         self.messages_to_send = []
-        self.received_messages = []
+        self.received_messages = Inbox(self.__inbox_size, self.__inbox_policy)
+        self._inbox_last = 0
+        self._inbox_max = 0
         self._init_state()
 
     def filter_observations(self, state):
@@ -614,6 +695,21 @@ class BW4TAgentBrain(AgentBrain):
             # Add the message object to the received messages
             self.received_messages.append(mssg)
 
+        self._inbox_last = len(self.received_messages)
+        self._inbox_max = max(self._inbox_max, self._inbox_last)
+
+    def get_inbox_metrics(self):
+        """
+        Returns the message pressure on this agent, for get_log_data.
+        inbox_size is the nr of messages waiting in the inbox. BW4TLogger writes it
+        every tick, in the <agent>_inbox_size column.
+        """
+        return {'inbox_size': len(self.received_messages),
+                'inbox_delivered_size': self._inbox_last,
+                'inbox_max': self._inbox_max,
+                'inbox_dropped': self.received_messages.dropped,
+                'inbox_coalesced': self.received_messages.coalesced}
+
     def _init_state(self):
         self._state = State(memorize_for_ticks=self.memorize_for_ticks,
                             own_id=self.agent_id)
@@ -1,6 +1,6 @@
 from abc import  ABC
 from matrx.agents.agent_utils.state import State
-from bw4t.BW4TAgentBrain import BW4TAgentBrain
+from bw4t.BW4TAgentBrain import BW4TAgentBrain, DROP_OLDEST
 from typing import final, List, Dict, Final, Set
 from matrx.messages import Message
 
@@ -12,7 +12,9 @@ class BW4TBrain(BW4TAgentBrain, ABC):
         
     NOT_ALLOWED_PARAMS:Final[Set[str]] ={'remove_range', 'grab_range', 'door_range', 'action_duration'}
    
-    DEFAULT_SETTINGS:Final[Dict[str,object]]={'slowdown':1, 'grab_range':1}
+    DEFAULT_SETTINGS:Final[Dict[str,object]]={'slowdown':1, 'grab_range':1,
+        'inbox_size':1024, 'inbox_policy':DROP_OLDEST, 'planner':'grid',
+        'structured_messages':False, 'trust_matrix':False, 'batched_planning':False, 'reservations':False}
 
     def __init__(self, settings:Dict[str,object]):
         '''
@@ -20,14 +22,33 @@ class BW4TBrain(BW4TAgentBrain, ABC):
         * slowdown : integer. Basically this sets action_duration
         field to the given slowdown. 1 implies normal speed
         of 1 action per tick. 3 givs 1 allowed action every 3 ticks. etc
+        * inbox_size : max nr of received messages kept in received_messages.
+        * inbox_policy : DROP_OLDEST or COALESCE, see BW4TAgentBrain.Inbox.
+        * planner : path planner of agents that navigate on the layout,
+        'grid', 'rooms', 'jps' or 'dstar', see agents1.Navigation.PLANNERS.
+        * structured_messages : True to send messages as agents1.Message.Packet instead of text.
+        Only for teams of agents that all read Packets.
+        * trust_matrix : True to keep trust in the agents1.Trust.TrustMatrix of the team.
+        * batched_planning : True to plan paths together with the other agents,
+        see agents1.Planning.PlanningService.
+        * reservations : True to plan paths around the other agents of the team,
+        see agents1.Reservations.ReservationTable.
         Implementors of BW4TBrain are NOT ALLOWED TO CHANGE THE VALUES OF NOT ALLOWED PARAMS.
         This is to ensure that agents run at the required speed.      
         Missing values get the value from DEFAULT_SETTINGS.
         '''
         self.__settings = self.DEFAULT_SETTINGS.copy()
         self.__settings.update(settings)
-        super().__init__()
+        super().__init__(inbox_size=self.__settings['inbox_size'],
+                         inbox_policy=self.__settings['inbox_policy'])
     
+    def get_setting(self, name:str):
+        '''
+        @param name name of a setting
+        @return the value of the setting, from DEFAULT_SETTINGS if it was not given
+        '''
+        return self.__settings[name]
+
     @final
     def initialize(self):
         super().initialize()
@@ -1,3 +1,5 @@
+import csv
+import os
 import numpy as np
 from matrx.logger.logger import GridWorldLogger
 from matrx.grid_world import GridWorld
@@ -6,11 +8,64 @@ from matrx.grid_world import GridWorld
 class BW4TLogger(GridWorldLogger):
     '''
     Logs the things we need for bw4t:
-    agent actions, world-completed info, messages info
+    agent actions, world-completed info, messages info, and the nr of
+    messages waiting in the inbox of each agent (<agent>_inbox_size)
+
+    By default every tick is appended as a row to a csv file.
+    The columnar format instead keeps the columns in memory and writes them
+    as numpy arrays to a .npz file at the last tick. Action names are stored
+    as integer codes into the 'action_names' array, see Statistics for reading it.
+
+    At the last tick the metrics that the agents return from get_log_data
+    (path planning, inbox, trust, ...) are written to <log name>_agents.csv,
+    one row per agent with the values of the last tick.
+
+    If the agents keep their trust in a TrustMatrix, they pass a snapshot of it
+    as 'trust_matrix' in their log data. The matrix is copied whenever it changes
+    and the copies are written to <log name>_trust.npz at the last tick.
     '''
-    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
+    # code of the empty action (agent idle) in the columnar format
+    NO_ACTION = 0
+
+    # key of the trust matrix snapshot in the log data of an agent
+    TRUST_MATRIX = 'trust_matrix'
+
+    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";", columnar=False,
+                 message_type=None):
+        '''
+        @param columnar True to write the columnar .npz format instead of csv.
+        The file_extension is then always .npz
+        @param message_type function that returns the type (an Enum) of a message content, or None
+        if the content has no known type. The messages are counted per type, see getMessageCounts.
+        Without it all messages are counted as OTHER.
+        '''
+        if columnar:
+            file_extension = ".npz"
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
+        self._delimiter = delimeter
+        self._columnar = columnar
+        # True once the files of the end of the run are written, see close
+        self._closed = False
+        self._message_type = message_type
+        # columnar format: column name -> list of values, and action name -> code
+        self._columns = {}
+        self._action_codes = {'': self.NO_ACTION}
+        # agent id -> log data of the agent at the last logged tick
+        self._agent_metrics = {}
+        # trust matrix snapshots: tick nr, scores and the version of the matrix at the last snapshot
+        self._trust_ticks = []
+        self._trust_scores = []
+        self._trust_version = 0
+        self._trust_matrix = None
+        # Message counters, kept up to date incrementally so that each log call only
+        # has to look at the messages of the ticks that passed since the previous call.
+        # _mssg_ticks: agent id -> nr of ticks in which the agent sent at least one message
+        # _mssg_types: agent id -> {message type name: nr of messages of that type}
+        self._mssg_ticks = {}
+        self._mssg_types = {}
+        # ticks 0.._counted_ticks-1 have been added to the counters
+        self._counted_ticks = 0
 
     def log(self, grid_world:GridWorld, agent_data):
         # So agent_data is a dictionary of shape: {<agent id>: <result from agent's get_log_data>, ...}
@@ -22,22 +77,141 @@ class BW4TLogger(GridWorldLogger):
         for agent_id, agent_body in grid_world.registered_agents.items():
             data[agent_id+'_acts'] = agent_body.current_action
 
-        gwmm = grid_world.message_manager
-        t = grid_world.current_nr_ticks-1
+        # the messages of the current tick may still come in, so count up to the previous one
+        self._count_messages(grid_world.message_manager, grid_world.current_nr_ticks-1)
         for agent_id, agent_body in grid_world.registered_agents.items():
-            data[agent_id+'_mssg']=0
-            for i in range(0,t):
-                if i in gwmm.preprocessed_messages.keys():
-                    for mssg in gwmm.preprocessed_messages[i]:
-                        if mssg.from_id==agent_id:
-                            data[agent_id+'_mssg']+=1
-                            break
+            data[agent_id+'_mssg'] = self._mssg_ticks.get(agent_id, 0)
+        # messages waiting in the inbox of each agent, 0 for agents that do not report it in their log data
+        for agent_id in grid_world.registered_agents:
+            data[agent_id+'_inbox_size'] = agent_data.get(agent_id, {}).get('inbox_size', 0)
+
+        self._collect_agent_data(agent_data)
+        if self._columnar:
+            data['tick_nr'] = grid_world.current_nr_ticks
+            for column, value in data.items():
+                if column.endswith('_acts'):
+                    value = self._action_codes.setdefault(value or '', len(self._action_codes))
+                self._columns.setdefault(column, []).append(value)
+            # nothing for the csv writer of GridWorldLogger
+            data = None
+
+        # the grid world checked its goal before logging, so this is the last log call of the run
+        if grid_world.is_done:
+            self.close()
         return data
 
+    def close(self):
+        '''
+        Writes the files that are only written at the end of a run: the columnar
+        log, <log name>_agents.csv and <log name>_trust.npz. Called at the last tick,
+        and by BW4TWorld.run for runs that stopped otherwise, eg through the api.
+        Calling it again does nothing.
+        '''
+        if self._closed:
+            return
+        self._closed = True
+        if self._columnar:
+            self._write_columns()
+        self._write_agent_metrics()
+        self._write_trust()
+
+    def _count_messages(self, gwmm, t):
+        '''
+        Adds the messages of ticks _counted_ticks..t-1 to the message counters.
+        @param gwmm the message manager of the grid world
+        @param t the first tick that is not counted yet after this call
+        '''
+        for tick in range(self._counted_ticks, t):
+            senders = set()
+            for mssg in gwmm.preprocessed_messages.get(tick, []):
+                senders.add(mssg.from_id)
+                mt = None if self._message_type is None else self._message_type(mssg.content)
+                types = self._mssg_types.setdefault(mssg.from_id, {})
+                name = 'OTHER' if mt is None else mt.name
+                types[name] = types.get(name, 0) + 1
+            for sender in senders:
+                self._mssg_ticks[sender] = self._mssg_ticks.get(sender, 0) + 1
+        self._counted_ticks = max(self._counted_ticks, t)
+
+    def _write_columns(self):
+        '''
+        Writes the columns logged so far to the .npz file.
+        Next to the logged columns the file contains 'agents', the agent ids
+        in column order, and 'action_names', the action name for each code.
+        '''
+        arrays = {}
+        for column, values in self._columns.items():
+            if column == 'done':
+                arrays[column] = np.array(values, dtype=bool)
+            elif column.endswith('_acts'):
+                arrays[column] = np.array(values, dtype=np.int16)
+            else:
+                arrays[column] = np.array(values, dtype=np.int64)
+        arrays['agents'] = np.array([column[:-len('_acts')] for column in self._columns
+                                     if column.endswith('_acts')], dtype=str)
+        names = sorted(self._action_codes, key=self._action_codes.get)
+        arrays['action_names'] = np.array(names, dtype=str)
+        np.savez(self.getFileName(), **arrays)
+
+    def _collect_agent_data(self, agent_data):
+        '''
+        Keeps the metrics in the log data of the agents, and copies the scores
+        of the trust matrix snapshot if they changed. The agents of a team share
+        the matrix, so the first snapshot is used.
+        '''
+        self._agent_metrics = agent_data
+        snapshot = next((data[self.TRUST_MATRIX] for data in agent_data.values() if self.TRUST_MATRIX in data), None)
+        if snapshot is None:
+            return
+        self._trust_matrix = snapshot
+        if snapshot['version'] != self._trust_version:
+            self._trust_version = snapshot['version']
+            self._trust_ticks.append(snapshot['tick'])
+            self._trust_scores.append(snapshot['scores'].astype(np.float32))
+
+    def _write_agent_metrics(self):
+        '''
+        Writes the metrics of the agents at the last logged tick to <log name>_agents.csv,
+        a row per agent and a column per metric, empty if an agent has no such metric.
+        '''
+        columns = []
+        for metrics in self._agent_metrics.values():
+            columns.extend(column for column in metrics if column not in columns and column != self.TRUST_MATRIX)
+        if len(columns) == 0:
+            return
+        with open(os.path.splitext(self.getFileName())[0] + '_agents.csv', mode='w', newline='') as data_file:
+            csv_writer = csv.DictWriter(data_file, delimiter=self._delimiter, fieldnames=['agent'] + columns,
+                                        extrasaction='ignore')
+            csv_writer.writeheader()
+            for agent_id, metrics in self._agent_metrics.items():
+                csv_writer.writerow({'agent': agent_id, **metrics})
+
+    def _write_trust(self):
+        '''
+        Writes the copies of the trust matrix to <log name>_trust.npz,
+        if the agents passed a trust matrix snapshot.
+        '''
+        snapshot = self._trust_matrix
+        if snapshot is None:
+            return
+        np.savez(os.path.splitext(self.getFileName())[0] + '_trust.npz',
+                 members=np.array(snapshot['members'], dtype=str),
+                 ticks=np.array(self._trust_ticks, dtype=np.int64),
+                 scores=np.array(self._trust_scores, dtype=np.float32).reshape(
+                     (len(self._trust_scores),) + snapshot['scores'].shape),
+                 confirmed=snapshot['confirmed'], contradicted=snapshot['contradicted'])
+
+    def getMessageCounts(self):
+        '''
+        @return dict with as key the agent id and as value a dict with the number of
+        messages the agent sent per message type, up to the last logged tick.
+        '''
+        return {agent_id: types.copy() for agent_id, types in self._mssg_types.items()}
+
     # workaround for issue matrx267
     def getFileName(self):
         '''
         @return the log filename written by this logger
         '''
         return self._GridWorldLogger__file_name
-    
\ No newline at end of file
+    
@@ -2,6 +2,7 @@ import numpy as np
 import random
 import pathlib
 import os
+import time
 from typing import Final, List
 from matrx.actions.move_actions import MoveEast, MoveSouth, MoveWest 
 from matrx.actions import MoveNorth, OpenDoorAction, CloseDoorAction 
@@ -12,6 +13,7 @@ from matrx.agents import SenseCapability
 from matrx.utils import get_room_locations
 from bw4t.BW4TBlocks import CollectableBlock, GhostBlock
 from agents1.BW4THuman import Human
+from agents1.Message import message_type
 from bw4t.CollectionGoal import CollectionGoal
 from bw4t.BW4TLogger import BW4TLogger
 from bw4t.BW4THumanBrain import HumanBrain
@@ -53,10 +55,20 @@ DEFAULT_WORLDSETTINGS: dict={
     'block_sense_range': 1,  # the range with which agents detect blocks
     'other_sense_range':  np.inf , # the range with which agents detect other objects (walls, doors, etc.)
     'agent_memory_decay': 5,  # we want to memorize states for seconds / tick_duration ticks
-    'fov_occlusion' : True # true if walls block vision. Not sure if this works at all.
+    'fov_occlusion' : True, # true if walls block vision. Not sure if this works at all.
+    'agents_traversable': True, # False if agents can not move onto the tile of another agent
     
 }
 
+# Headless profile for runs that are bounded by wall clock time (benchmarks, nightly evaluations):
+# no sleeping between ticks, and no matrx API, visualizer or media folder.
+HEADLESS_WORLDSETTINGS: dict = {**DEFAULT_WORLDSETTINGS,
+    'tick_duration': 0,
+    'matrx_paused': False,
+    'run_matrx_api': False,
+    'run_matrx_visualizer': False,
+}
+
 
 class BW4TWorld:
     '''
@@ -68,7 +80,8 @@ class BW4TWorld:
     internally creates the gridworld using WorldBuilder.
     
     '''
-    def __init__(self, agents:List[dict], worldsettings:dict=DEFAULT_WORLDSETTINGS):
+    def __init__(self, agents:List[dict], worldsettings:dict=DEFAULT_WORLDSETTINGS, logfile_prefix:str="",
+                 columnar_log:bool=False):
         '''
            @param agents a list like 
             [
@@ -77,6 +90,11 @@ class BW4TWorld:
             ]
             Names must all be unique.
             Check BW4TBrain for more on the agents specification.
+           @param logfile_prefix prefix for the log file name. The log file name
+            otherwise only contains the time stamp, so worlds created in the same
+            second (eg in parallel processes) need different prefixes.
+           @param columnar_log True to log in the columnar .npz format of BW4TLogger
+            instead of csv. Statistics reads both.
         '''
         self._worldsettings=worldsettings;
         self._agents=agents
@@ -105,20 +123,57 @@ class BW4TWorld:
         # Add the agents and human agents to the top row of the world
         self._addAgents()
         
-        #media_folder = os.path.dirname(os.path.join(os.path.realpath(__file__), "media"))
-        media_folder = pathlib.Path().resolve()
-        self._builder.startup(media_folder=media_folder)
-        self._builder.add_logger(BW4TLogger, save_path='.')
+        # headless worlds have nothing to start up
+        if worldsettings['run_matrx_api'] or worldsettings['run_matrx_visualizer']:
+            #media_folder = os.path.dirname(os.path.join(os.path.realpath(__file__), "media"))
+            media_folder = pathlib.Path().resolve()
+            self._builder.startup(media_folder=media_folder)
+        self._builder.add_logger(BW4TLogger, save_path='.', file_name_prefix=logfile_prefix,
+            columnar=columnar_log, message_type=message_type)
 
         self._gridworld = self._builder.worlds(nr_of_worlds=1).__next__()
+        self._ticks_per_second = None
 
     def run(self):
         '''
-        run the world till termination
+        run the world till termination.
+        For headless worlds the achieved ticks/second is printed,
+        in other worlds it includes time spent paused or waiting for the visualizer.
         '''
+        start = time.perf_counter()
         self._gridworld.run(self._builder.api_info)
+        # the logger writes its end of run files at the last tick, unless the run was stopped before it
+        self.getLogger().close()
+        duration = time.perf_counter() - start
+        ticks = self._gridworld.current_nr_ticks
+        self._ticks_per_second = ticks / duration if duration > 0 else float('inf')
+        if not self._worldsettings['run_matrx_api']:
+            print(f"Ran {ticks} ticks in {duration:.2f}s ({self._ticks_per_second:.1f} ticks/s)")
         return self
+
+    def getTicksPerSecond(self)->float:
+        '''
+        @return the achieved ticks/second of the last run(), None if the world did not run yet
+        '''
+        return self._ticks_per_second
         
+    def getState(self)->dict:
+        '''
+        @return the complete state of the world as dict of object id to properties,
+            eg to build the Layout of the map without running the world
+        '''
+        state = {obj_id: obj.properties for obj_id, obj in self._gridworld.environment_objects.items()}
+        state.update((agent_id, body.properties) for agent_id, body in self._gridworld.registered_agents.items())
+        state['World'] = {'nr_ticks': self._gridworld.current_nr_ticks, 'grid_shape': self._gridworld.shape,
+                          'tick_duration': self._gridworld.tick_duration, 'world_ID': self._gridworld.world_id}
+        return state
+
+    def getAgentLogData(self)->dict:
+        '''
+        @return dict with for each agent id the current result of get_log_data of its brain
+        '''
+        return {agent_id: body.get_log_data() for agent_id, body in self._gridworld.registered_agents.items()}
+
     def getLogger(self)->BW4TLogger:
         '''
         @return the logger. We assume there is only 1: BW4TLogger
@@ -189,11 +244,13 @@ class BW4TWorld:
                 self._builder.add_human_agent(loc, brain,
                 team=team_name, name=agent['name'],
                 key_action_map=self._worldsettings['key_action_map'],
-                sense_capability=sense_capability, visualize_shape=2, visualize_colour='#FFFF00')
+                sense_capability=sense_capability, visualize_shape=2, visualize_colour='#FFFF00',
+                is_traversable=self._worldsettings.get('agents_traversable', True))
             else:
                 self._builder.add_agent(loc, brain, 
                 team=team_name, name=agent['name'], 
-                sense_capability=sense_capability, visualize_shape=1, visualize_colour=self._worldsettings['block_colors'][random.randint(0,2)])
+                sense_capability=sense_capability, visualize_shape=1, visualize_colour=self._worldsettings['block_colors'][random.randint(0,2)],
+                is_traversable=self._worldsettings.get('agents_traversable', True))
      
     def _addRooms(self):
         '''
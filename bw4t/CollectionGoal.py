@@ -2,7 +2,14 @@ import numpy as np # type: ignore
 
 from matrx.goals import WorldGoal # type: ignore
 from matrx.grid_world import GridWorld # type: ignore
-from matrx.objects.env_object import EnvObject # type: ignore
+from matrx.actions.object_actions import GrabObject, DropObject, RemoveObject # type: ignore
+
+# The actions that can change which block lies in a drop zone, with the name of their range argument and the range
+# to assume when it is not given. After such an action, the drop zone locations in range of the acting agent are
+# checked again. matrx does not limit the range of RemoveObject without remove_range in its is_possible check.
+BLOCK_ACTIONS = {GrabObject.__name__: ('grab_range', 1),
+                 DropObject.__name__: ('drop_range', 1),
+                 RemoveObject.__name__: ('remove_range', np.inf)}
 
 
 class CollectionGoal(WorldGoal):
@@ -24,9 +31,27 @@ class CollectionGoal(WorldGoal):
         # the right order.
         self.__drop_off:dict = {}
 
+        # Index from drop location to (zone nr, rank), built together with __drop_off.
+        self.__drop_locs:dict = {}
+
+        # For each agent the start tick of the last grab/drop action that we handled, so that every
+        # action is handled once. Drop locations are only checked again after such an action.
+        self.__handled_actions:dict = {}
+
+        # True if all drop locations have to be checked, instead of only those near grab/drop actions.
+        self.__rescan = True
+
+        # The (is_satisfied, progress) result of __check_completion, only recomputed if a drop location changed.
+        self.__completion = (False, 0)
+
         # We also track the progress
         self.__progress = 0
 
+        # isBlocksPlaced is called several times per tick (goal check, logger), so its result is
+        # cached for the tick it was computed in. None if there is no valid cached result.
+        self.__cache_tick = None
+        self.__is_satisfied = False
+
     #override
     def goal_reached(self, grid_world: GridWorld):
         if grid_world.current_nr_ticks >= self.max_nr_ticks:
@@ -35,8 +60,11 @@ class CollectionGoal(WorldGoal):
 
     def isBlocksPlaced(self, grid_world:GridWorld):
         '''
-        @return true if all blocks have been placed in right order
+        @return true if all blocks have been placed in right order.
+        The result is computed once per tick, see invalidate.
         '''
+        if self.__cache_tick == grid_world.current_nr_ticks:
+            return self.__is_satisfied
 
         if self.__drop_off =={}:  # find all drop off locations, its tile ID's and goal blocks
             self.__find_drop_off_locations(grid_world)
@@ -47,8 +75,28 @@ class CollectionGoal(WorldGoal):
         # Progress in percentage
         self.__progress = progress / sum([len(goal_blocks)\
             for goal_blocks in self.__drop_off.values()])
+
+        self.__cache_tick = grid_world.current_nr_ticks
+        self.__is_satisfied = is_satisfied
         return is_satisfied
 
+    def getProgress(self):
+        '''
+        @return fraction of the goal blocks that is placed in right order,
+        as computed by the last isBlocksPlaced call
+        '''
+        return self.__progress
+
+    def invalidate(self):
+        '''
+        Forget the result cached for the current tick, so that the next
+        isBlocksPlaced call evaluates all drop zones again. Call this if
+        blocks were moved after isBlocksPlaced was called in a tick, or
+        were moved by something else than an agent's grab or drop action.
+        '''
+        self.__cache_tick = None
+        self.__rescan = True
+
     def __find_drop_off_locations(self, grid_world:GridWorld):
 
         goal_blocks = {}  # dict with as key the zone nr and values list of ghostly goal blocks
@@ -63,6 +111,7 @@ class CollectionGoal(WorldGoal):
                         goal_blocks[zone_nr] = [obj]
 
         self.__drop_off:dict = {}
+        self.__drop_locs:dict = {}
         for zone_nr in goal_blocks.keys():  # go through all drop of zones and fill the drop_off dict
             # Instantiate the zone's dict.
             self.__drop_off[zone_nr] = {}
@@ -88,35 +137,79 @@ class CollectionGoal(WorldGoal):
                     if block.location == loc:
                         # Add to self.drop_off
                         self.__drop_off[zone_nr][rank] = [loc, block.visualize_shape, block.visualize_colour, None]
+                        self.__drop_locs[loc] = (zone_nr, rank)
+
+    def __changed_drop_locations(self, grid_world:GridWorld):
+        '''
+        @return set of drop locations that may have changed since the previous call:
+        those in range of agents that completed a grab or drop action.
+        '''
+        if self.__rescan:
+            self.__rescan = False
+            return set(self.__drop_locs.keys())
+
+        curr_tick = grid_world.current_nr_ticks
+        changed = set()
+        for agent_id, agent in grid_world.registered_agents.items():
+            if agent.current_action not in BLOCK_ACTIONS:
+                continue
+            started = agent.current_action_tick_started
+            # skip actions that are not performed yet, or that we handled already
+            if started + agent.current_action_duration_in_ticks >= curr_tick \
+                    or self.__handled_actions.get(agent_id) == started:
+                continue
+            self.__handled_actions[agent_id] = started
+
+            range_arg, default_range = BLOCK_ACTIONS[agent.current_action]
+            action_range = agent.current_action_args.get(range_arg, default_range)
+            x, y = agent.location
+            if action_range == np.inf or (2 * action_range + 1) ** 2 > len(self.__drop_locs):
+                changed.update(loc for loc in self.__drop_locs
+                               if abs(loc[0] - x) <= action_range and abs(loc[1] - y) <= action_range)
+            else:
+                for dx in range(-action_range, action_range + 1):
+                    for dy in range(-action_range, action_range + 1):
+                        if (x + dx, y + dy) in self.__drop_locs:
+                            changed.add((x + dx, y + dy))
+        return changed
+
+    def __blocks_at(self, grid_world:GridWorld, loc):
+        '''
+        @return the collectable blocks at the given location
+        '''
+        obj_ids = grid_world.grid[loc[1], loc[0]]
+        if obj_ids is None:
+            return []
+        all_objs = grid_world.environment_objects
+        return [all_objs[obj_id] for obj_id in obj_ids
+                if obj_id in all_objs.keys() and all_objs[obj_id].properties.get("is_collectable", False)]
 
     def __check_completion(self, grid_world:GridWorld):
+        # Only the drop locations near a grab or drop action can have changed
+        changed = self.__changed_drop_locations(grid_world)
+        if len(changed) == 0:
+            return self.__completion
+
         # Get the current tick number
         curr_tick = grid_world.current_nr_ticks
 
-        # loop through all zones, check the blocks and set the tick if satisfied
-        for zone_nr, goal_blocks in self.__drop_off.items():
-            # Go through all ranks of this drop off zone
-            for rank, block_data in goal_blocks.items():
-                loc = block_data[0]  # the location, needed to find blocks here
-                shape = block_data[1]  # the desired shape
-                colour = block_data[2]  # the desired colour
-                tick = block_data[3]
-
-                # Retrieve all objects, the object ids at the location and obtain all BW4T Blocks from it
-                all_objs = grid_world.environment_objects
-                obj_ids = grid_world.get_objects_in_range(loc, object_type=EnvObject, sense_range=0)
-                blocks = [all_objs[obj_id] for obj_id in obj_ids
-                          if obj_id in all_objs.keys() and "is_collectable" in all_objs[obj_id].properties.keys()]
-                blocks = [b for b in blocks if b.properties["is_collectable"]]
-
-                # Check if there is a block, and if so if it is the right one and the tick is not yet set, then set the
-                # current tick.
-                if len(blocks) > 0 and blocks[0].visualize_shape == shape and blocks[0].visualize_colour == colour and \
-                        tick is None:
-                    self.__drop_off[zone_nr][rank][3] = curr_tick
-                # if there is no block, reset its tick to None
-                elif len(blocks) == 0:
-                    self.__drop_off[zone_nr][rank][3] = None
+        # check the blocks at the changed locations and set the tick if satisfied
+        for loc in changed:
+            zone_nr, rank = self.__drop_locs[loc]
+            shape = self.__drop_off[zone_nr][rank][1]  # the desired shape
+            colour = self.__drop_off[zone_nr][rank][2]  # the desired colour
+            tick = self.__drop_off[zone_nr][rank][3]
+
+            blocks = self.__blocks_at(grid_world, loc)
+
+            # Check if there is a block, and if so if it is the right one and the tick is not yet set, then set the
+            # current tick.
+            if len(blocks) > 0 and blocks[0].visualize_shape == shape and blocks[0].visualize_colour == colour and \
+                    tick is None:
+                self.__drop_off[zone_nr][rank][3] = curr_tick
+            # if there is no block, reset its tick to None
+            elif len(blocks) == 0:
+                self.__drop_off[zone_nr][rank][3] = None
 
         # Now check if all blocks are collected in the right order
         is_satisfied = True
@@ -139,4 +232,5 @@ class CollectionGoal(WorldGoal):
             # update our satisfied boolean
             is_satisfied = is_satisfied and zone_satisfied
 
-        return is_satisfied, progress
\ No newline at end of file
+        self.__completion = (is_satisfied, progress)
+        return self.__completion
\ No newline at end of file
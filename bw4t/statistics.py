@@ -2,12 +2,13 @@ from typing import final, List, Dict, Final
 import sys
 import csv
 import os
+import numpy as np
 
 MOVES=['MoveNorth','MoveNorthEast','MoveEast','MoveSouthEast',
        'MoveSouth','MoveSouthWest','MoveWest','MoveNorthWest']
 
 class Statistics:
-    def __init__(self, filename:str):
+    def __init__(self, filename:str, streaming:bool=False):
         '''
         @param filename the path to the csv file to read.
         It  is assumed that first row of the file contains the element headers
@@ -19,10 +20,22 @@ class Statistics:
 
         done is True only in the last row.
         drops contains number of drops IN DROP ZONE.
+        @param streaming if True, the file is analysed in a single pass
+        that does not keep the rows in memory. Use this for large logs.
+
+        Files ending with .npz are read as the columnar format of BW4TLogger,
+        the streaming setting does not apply to those.
         '''
         self._filename=filename
-        self._contents=self._read()
-        self._analyse()
+        if filename.endswith('.npz'):
+            self._contents=None
+            self._load_columnar()
+        elif streaming:
+            self._contents=None
+            self._stream()
+        else:
+            self._contents=self._read()
+            self._analyse()
         
     def _read(self)->List[Dict[str,str]]:
         '''
@@ -67,23 +80,94 @@ class Statistics:
                 if 'DropObject'==row[agent+'_acts']:
                     self._drops[agent]+=1
                 self._messages[agent] = row[agent+'_mssg']
-                
+
+    def _stream(self):
+        '''
+        read and analyse the csv file in a single pass over the rows,
+        keeping only the agents found in the header and the last row.
+        Gives the same results as _read followed by _analyse.
+        '''
+        header:List[str]=[]
+        last:List[str]=[]
+        agents:List[str]=[]
+        self._moves={}
+        self._drops={}
+        with open(self._filename) as csvfile:
+            reader = csv.reader(csvfile, delimiter=';', quotechar="'")
+            for row in reader:
+                if header==[]:
+                    header=row
+                    agents=[column[:len(column)-5] for column in header if column.endswith("_acts")]
+                    acts=[(agent, header.index(agent+'_acts')) for agent in agents]
+                    self._moves={agent:0 for agent in agents}
+                    self._drops={agent:0 for agent in agents}
+                    continue
+                for agent, idx in acts:
+                    if row[idx] in MOVES:
+                        self._moves[agent] += 1
+                    elif 'DropObject'==row[idx]:
+                        self._drops[agent]+=1
+                last=row
+
+        if last==[]:
+            # same as getAgents for a file without rows
+            agents=[]
+            self._moves={}
+            self._drops={}
+            self._last_row={}
+        else:
+            self._last_row={header[i]: last[i] for i in range(len(header))}
+        self._agents=agents
+        self._messages={agent:self._last_row[agent+'_mssg'] for agent in agents}
+
+    def _load_columnar(self):
+        '''
+        read and analyse a .npz file written by BW4TLogger in columnar format.
+        Moves and drops are counted on the integer action codes.
+        Values of the last row are turned into strings, as in the csv file.
+        '''
+        with np.load(self._filename) as data:
+            agents=[str(agent) for agent in data['agents']]
+            names=data['action_names']
+            move_codes=[code for code, name in enumerate(names) if name in MOVES]
+            drop_codes=[code for code, name in enumerate(names) if name=='DropObject']
+            self._moves={}
+            self._drops={}
+            self._last_row={}
+            for agent in agents:
+                acts=data[agent+'_acts']
+                self._moves[agent]=int(np.isin(acts, move_codes).sum())
+                self._drops[agent]=int(np.isin(acts, drop_codes).sum())
+            if len(data['tick_nr'])>0:
+                self._last_row={column: str(data[column][-1]) for column in data.files
+                                if column not in ('agents', 'action_names')}
+            else:
+                agents=[]
+        self._agents=agents
+        self._messages={agent:self._last_row[agent+'_mssg'] for agent in agents}
+
     def getLastTick(self):
         '''
         @return tick nr of last line
         '''
+        if self._contents is None:
+            return self._last_row['tick_nr']
         return self._contents[-1]['tick_nr']        
     
     def isSucces(self):
         '''
         return 'done' field of last row 
         '''
+        if self._contents is None:
+            return self._last_row['done']
         return self._contents[len(self._contents)-1]['done']
     
     def getAgents(self):
         '''
         @return list of agents in the contents
         '''
+        if self._contents is None:
+            return list(self._agents)
         if len(self._contents)==0:
             return []
         agents =[]
@@ -93,6 +177,19 @@ class Statistics:
         return agents
                 
     
+    def getSummary(self)->dict:
+        '''
+        @return dict with the results of the run: the agents, success (bool),
+        last tick and the messages, drops and moves per agent.
+        Contains only plain types, so it can be pickled.
+        '''
+        return {'agents': self.getAgents(),
+                'success': self.isSucces() == 'True',
+                'last_tick': self.getLastTick(),
+                'messages': dict(self._messages),
+                'drops': dict(self._drops),
+                'moves': dict(self._moves)}
+
     def __str__(self):
         return "Statistics for "+self._filename\
             +"\nagents:"+str(self.getAgents())\
@@ -0,0 +1,152 @@
+import random
+import time
+from matrx.actions import MoveNorth, MoveEast, MoveSouth, MoveWest
+from bw4t.BW4TWorld import BW4TWorld, HEADLESS_WORLDSETTINGS
+from agents1.Layout import Layout
+from agents1.RoomGraph import RoomGraph
+from agents1.JumpPoint import JumpPointSearch
+from agents1.Navigation import GRID, ROOMS, JPS, DSTAR, PathNavigator
+from agents1.Planning import PlanningService
+
+'''
+Compares the path planners of agents1.Navigation on BW4T maps of increasing size:
+node expansions and wall clock time per planned path.
+All planners plan the same (start, goal) pairs between random traversable tiles, with all doors open.
+'''
+
+def make_state(nr_rooms:int)->dict:
+    '''
+    @param nr_rooms number of rooms of the map, laid out in a square
+    @return the complete state of a BW4T world with nr_rooms rooms and all doors open
+    '''
+    settings = dict(HEADLESS_WORLDSETTINGS, nr_rooms=nr_rooms, rooms_per_row=int(nr_rooms ** 0.5 + 0.99))
+    state = BW4TWorld([], worldsettings=settings).getState()
+    for obj in state.values():
+        if 'is_open' in obj:
+            obj['is_open'] = True
+    return state
+
+def make_layout(nr_rooms:int)->Layout:
+    '''
+    @param nr_rooms number of rooms of the map, laid out in a square
+    @return the Layout of a BW4T map with nr_rooms rooms and all doors open
+    '''
+    return Layout.of(make_state(nr_rooms))
+
+def run_planner(planner:str, layout:Layout, pairs):
+    '''
+    @param planner one of agents1.Navigation.PLANNERS
+    @param layout the map
+    @param pairs list of (start, goal) locations
+    @return (node expansions per path, milliseconds per path, total path length)
+    '''
+    search = {GRID: layout, ROOMS: RoomGraph.of(layout), JPS: JumpPointSearch.of(layout)}[planner]
+    expansions = search.expansions
+    start_time = time.perf_counter()
+    length = sum(len(search.path(start, goal)) for start, goal in pairs)
+    duration = time.perf_counter() - start_time
+    return (search.expansions - expansions) / len(pairs), 1000 * duration / len(pairs), length
+
+def run_planner_benchmark(room_counts, nr_paths:int=200, seed:int=1):
+    '''
+    Prints a table with the expansions and time per path of each planner for each map size.
+    The paths of all planners must have the same total length, all are shortest paths.
+    @param room_counts the map sizes, as number of rooms
+    @param nr_paths number of paths planned on each map
+    @param seed seed for picking the (start, goal) pairs
+    @return dict of nr_rooms to dict of planner to (expansions per path, ms per path)
+    '''
+    rng = random.Random(seed)
+    results = {}
+    print(f"{'rooms':>6} {'tiles':>7} {'planner':>8} {'expansions':>11} {'ms/path':>8}")
+    for nr_rooms in room_counts:
+        layout = make_layout(nr_rooms)
+        tiles = [(x, y) for x in range(layout.width) for y in range(layout.height) if layout.is_traversable((x, y))]
+        pairs = [(rng.choice(tiles), rng.choice(tiles)) for _ in range(nr_paths)]
+        results[nr_rooms] = {}
+        lengths = set()
+        for planner in (GRID, ROOMS, JPS):
+            expansions, ms, length = run_planner(planner, layout, pairs)
+            results[nr_rooms][planner] = (expansions, ms)
+            lengths.add(length)
+            print(f"{nr_rooms:>6} {len(tiles):>7} {planner:>8} {expansions:>11.1f} {ms:>8.3f}")
+        if len(lengths) != 1:
+            raise ValueError("Planners found paths of different length on map with rooms ", nr_rooms)
+    return results
+
+def run_batch_benchmark(nr_agents:int=20, nr_ticks:int=100, nr_rooms:int=25, seed:int=1):
+    '''
+    Compares planning the paths of all agents one by one with the grid planner, to planning them in one batch
+    per tick with the PlanningService. In each tick a random door opens or closes, and every agent plans
+    from a random tile to the front of a random door, as agents that all head for the unvisited doors,
+    or to the door itself, which can't be reached while it is closed.
+    @return dict of 'grid' and 'batched' to (expansions per tick, ms per tick)
+    '''
+    rng = random.Random(seed)
+    state = make_state(nr_rooms)
+    layout = Layout.of(state)
+    service = PlanningService.of(layout)
+    doors = [obj for obj in state.values() if 'is_open' in obj]
+    tiles = [(x, y) for x in range(layout.width) for y in range(layout.height) if layout.is_traversable((x, y))]
+    totals = {GRID: [0, 0.0], 'batched': [0, 0.0]}
+    for _ in range(nr_ticks):
+        door = rng.choice(doors)
+        door['is_open'] = not door['is_open']
+        layout.update_doors(state)
+        goals = [(target['location'][0], target['location'][1] + rng.choice((0, 1)))
+                 for target in rng.choices(doors, k=nr_agents)]
+        pairs = [(rng.choice(tiles), goal) for goal in goals]
+
+        expansions = layout.expansions
+        start_time = time.perf_counter()
+        paths = [layout.path(start, goal) for start, goal in pairs]
+        totals[GRID][1] += time.perf_counter() - start_time
+        totals[GRID][0] += layout.expansions - expansions
+
+        expansions = service.expansions
+        start_time = time.perf_counter()
+        requests = [service.request(start, [goal]) for start, goal in pairs]
+        batched_paths = [request.path() for request in requests]
+        totals['batched'][1] += time.perf_counter() - start_time
+        totals['batched'][0] += service.expansions - expansions
+
+        # the service puts the goal itself in the path if it can't be reached, as GenericAgent.path_through
+        if any(batched != (path or [goal]) for batched, path, goal in zip(batched_paths, paths, goals)):
+            raise ValueError("Batched planning found other paths than the grid planner")
+
+    print(f"{nr_agents} agents, {nr_rooms} rooms: {'planner':>8} {'expansions':>11} {'ms/tick':>8}")
+    results = {}
+    for planner, (expansions, duration) in totals.items():
+        results[planner] = (expansions / nr_ticks, 1000 * duration / nr_ticks)
+        print(f"{'':>22} {planner:>8} {results[planner][0]:>11.1f} {results[planner][1]:>8.3f}")
+    return results
+
+def check_repair_counts(nr_rooms:int=9):
+    '''
+    Checks that the DSTAR planner counts a full plan for a new goal, and a repair only when a door
+    opened or closed since the previous plan towards the same goal.
+    @return (full plans, repairs) of the navigator after the check
+    '''
+    state = make_state(nr_rooms)
+    navigator = PathNavigator('agent', [MoveNorth.__name__, MoveEast.__name__, MoveSouth.__name__,
+                                        MoveWest.__name__], planner=DSTAR)
+    layout = navigator.layout(state)
+    tiles = [(x, y) for x in range(layout.width) for y in range(layout.height) if layout.is_traversable((x, y))]
+    start, goal = tiles[0], tiles[-1]
+    door = next(obj for obj in state.values() if 'is_open' in obj)
+
+    counts = []
+    for toggle in (False, False, True, False, True):
+        if toggle:
+            door['is_open'] = not door['is_open']
+            navigator.layout(state)
+        navigator.plan(start, goal)
+        counts.append((navigator.full_plans, navigator.repairs))
+    if counts != [(1, 0), (1, 0), (1, 1), (1, 1), (1, 2)]:
+        raise ValueError("Wrong nr of full plans and repairs after door changes ", counts)
+    return counts[-1]
+
+if __name__ == "__main__":
+    check_repair_counts()
+    run_planner_benchmark([9, 25, 49, 100, 225])
+    run_batch_benchmark()
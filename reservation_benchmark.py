@@ -0,0 +1,63 @@
+import random
+from bw4t.BW4TWorld import BW4TWorld, HEADLESS_WORLDSETTINGS
+from bw4t.statistics import Statistics
+from agents1.StrongAgent import StrongAgent
+from agents1.ColorblindAgent import ColorblindAgent
+
+'''
+Compares teams that plan paths with and without the ReservationTable of the team (setting 'reservations'),
+in worlds where agents can not move onto each other's tiles.
+'''
+
+# agents that make up the teams, in this order
+AGENT_CLASSES = [StrongAgent, ColorblindAgent]
+
+def make_team(nr_agents:int, reservations:bool):
+    '''
+    @param nr_agents size of the team
+    @param reservations True if the agents plan around each other
+    @return list of agents as given to BW4TWorld
+    '''
+    return [{'name': f"{AGENT_CLASSES[i % len(AGENT_CLASSES)].__name__.lower()}{i}",
+             'botclass': AGENT_CLASSES[i % len(AGENT_CLASSES)],
+             'settings': {'reservations': reservations}} for i in range(nr_agents)]
+
+def run_team(nr_agents:int, reservations:bool, seed:int, deadline:int):
+    '''
+    @return dict with success (bool), last_tick, moves, failed_moves and waits of the run
+    '''
+    random.seed(seed)
+    settings = dict(HEADLESS_WORLDSETTINGS, deadline=deadline, agents_traversable=False)
+    world = BW4TWorld(make_team(nr_agents, reservations), worldsettings=settings,
+                      logfile_prefix=f"reservations_{nr_agents}_{reservations}_").run()
+    summary = Statistics(world.getLogger().getFileName(), streaming=True).getSummary()
+    log_data = world.getAgentLogData().values()
+    return {'success': summary['success'], 'last_tick': int(summary['last_tick']),
+            'moves': sum(summary['moves'].values()),
+            'failed_moves': sum(data.get('navigator_failed_moves', 0) for data in log_data),
+            'waits': sum(data.get('navigator_waits', 0) for data in log_data)}
+
+def run_reservation_benchmark(team_sizes, number_of_runs:int=3, deadline:int=1500):
+    '''
+    Prints a table with the average ticks to completion, moves, failed moves and waits of each team size,
+    with and without reservations. Both variants get the same seeds.
+    @param team_sizes numbers of agents in the team
+    @param number_of_runs runs per team size and variant
+    @param deadline ticks after which a run stops, counted as its ticks to completion
+    @return dict of (team size, reservations) to list of run results, see run_team
+    '''
+    results = {}
+    for nr_agents in team_sizes:
+        for reservations in (False, True):
+            results[(nr_agents, reservations)] = [run_team(nr_agents, reservations, seed, deadline)
+                                                  for seed in range(number_of_runs)]
+
+    print(f"{'agents':>6} {'reserve':>8} {'success':>8} {'ticks':>8} {'moves':>8} {'failed':>8} {'waits':>8}")
+    for (nr_agents, reservations), runs in results.items():
+        avg = {key: sum(run[key] for run in runs) / len(runs) for key in runs[0]}
+        print(f"{nr_agents:>6} {str(reservations):>8} {avg['success']:>8.2f} {avg['last_tick']:>8.1f} "
+              f"{avg['moves']:>8.1f} {avg['failed_moves']:>8.1f} {avg['waits']:>8.1f}")
+    return results
+
+if __name__ == "__main__":
+    run_reservation_benchmark([4, 8, 16])